@@ -0,0 +1,216 @@
+import argparse
+import base64
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+
+import bcrypt
+import yaml
+
+# Multi-user logins and signed session tokens.
+# The YAML file uses streamlit-authenticator's layout, so either tool can manage it:
+#   credentials: {usernames: {email: {email, name, password: <bcrypt hash>}}}
+#   cookie: {name, key, expiry_days}
+#   python auth.py add-user someone@example.com --name "Someone"
+
+CREDENTIALS_PATH = os.environ.get('BID_TRACKER_CREDENTIALS', 'credentials.yaml')
+# bcrypt cost: each +1 doubles login time; stored hashes are upgraded/downgraded on next login
+BCRYPT_ROUNDS = int(os.environ.get('BID_TRACKER_BCRYPT_ROUNDS', 12))
+COOKIE_NAME = 'bid_tracker_session'
+COOKIE_EXPIRY_DAYS = 30
+
+# Account seeded into a new credentials file so the original login keeps working; change its password
+DEFAULT_ACCOUNT = {'email': 'ermias@ketos.co', 'name': 'Ermias', 'password': '18221822'}
+
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('ascii')
+
+
+# Cost factor of a stored hash ($2b$12$...)
+def hash_rounds(hashed):
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+# Credentials and cookie settings from the YAML file, re-read whenever the file changes.
+# Passwords are checked with bcrypt once per login; afterwards the browser holds a
+# signed, expiring token that is verified with a single HMAC on every reload.
+class CredentialStore:
+    def __init__(self, path=CREDENTIALS_PATH, rounds=BCRYPT_ROUNDS):
+        self.path = path
+        self.rounds = rounds
+        self._lock = threading.RLock()
+        self._config = None
+        self._mtime = None
+        self._dummy_hash = None
+
+    def _load(self):
+        with self._lock:
+            if not os.path.exists(self.path):
+                self._save(self._new_config())
+            mtime = os.stat(self.path).st_mtime_ns
+            if self._config is None or mtime != self._mtime:
+                with open(self.path, 'r') as f:
+                    config = yaml.safe_load(f) or {}
+                config.setdefault('credentials', {}).setdefault('usernames', {})
+                cookie = config.setdefault('cookie', {})
+                cookie.setdefault('name', COOKIE_NAME)
+                cookie.setdefault('expiry_days', COOKIE_EXPIRY_DAYS)
+                if not cookie.get('key'):
+                    cookie['key'] = secrets.token_hex(32)
+                    self._save(config)
+                    mtime = os.stat(self.path).st_mtime_ns
+                self._config, self._mtime = config, mtime
+            return self._config
+
+    def _new_config(self):
+        email = DEFAULT_ACCOUNT['email']
+        return {
+            'credentials': {'usernames': {email: {
+                'email': email,
+                'name': DEFAULT_ACCOUNT['name'],
+                'password': hash_password(DEFAULT_ACCOUNT['password'], self.rounds),
+            }}},
+            'cookie': {'name': COOKIE_NAME, 'key': secrets.token_hex(32), 'expiry_days': COOKIE_EXPIRY_DAYS},
+        }
+
+    # Written to a temp file and renamed, readable by the owner only (it holds the signing key)
+    def _save(self, config):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                yaml.safe_dump(config, f, sort_keys=False)
+            os.replace(tmp_path, self.path)
+            self._config, self._mtime = config, os.stat(self.path).st_mtime_ns
+
+    def _users(self):
+        return self._load()['credentials']['usernames']
+
+    @property
+    def cookie_name(self):
+        return self._load()['cookie']['name']
+
+    @property
+    def expiry_days(self):
+        return float(self._load()['cookie']['expiry_days'])
+
+    def users(self):
+        return {email: user.get('name', '') for email, user in self._users().items()}
+
+    def add_user(self, email, name, password):
+        email = email.strip().lower()
+        with self._lock:
+            config = self._load()
+            config['credentials']['usernames'][email] = {
+                'email': email, 'name': name, 'password': hash_password(password, self.rounds)}
+            self._save(config)
+
+    def remove_user(self, email):
+        with self._lock:
+            config = self._load()
+            removed = config['credentials']['usernames'].pop(email.strip().lower(), None) is not None
+            if removed:
+                self._save(config)
+            return removed
+
+    # bcrypt check of a login; hashes made with a different cost are re-hashed at the configured one
+    def verify_password(self, email, password):
+        email = (email or '').strip().lower()
+        user = self._users().get(email)
+        hashed = user.get('password', '') if user else ''
+        if not user or not hashed.startswith('$2'):
+            # Check against a throwaway hash so unknown emails take as long as a wrong password
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(secrets.token_hex(8), self.rounds)
+            bcrypt.checkpw((password or '').encode('utf-8'), self._dummy_hash.encode('ascii'))
+            return False
+        if not bcrypt.checkpw((password or '').encode('utf-8'), hashed.encode('ascii')):
+            return False
+        if hash_rounds(hashed) != self.rounds:
+            with self._lock:
+                config = self._load()
+                if email in config['credentials']['usernames']:
+                    config['credentials']['usernames'][email]['password'] = hash_password(password, self.rounds)
+                    self._save(config)
+        return True
+
+    def _sign(self, payload):
+        key = self._load()['cookie']['key'].encode('utf-8')
+        return _b64encode(hmac.new(key, payload.encode('utf-8'), hashlib.sha256).digest())
+
+    # "<payload>.<signature>" where payload is {'sub': email, 'exp': unix time}
+    def issue_token(self, email, now=None):
+        expires = int((now or time.time()) + self.expiry_days * 86400)
+        payload = _b64encode(json.dumps({'sub': email.strip().lower(), 'exp': expires}).encode('utf-8'))
+        return f"{payload}.{self._sign(payload)}"
+
+    # The email a token was issued to, or None if it is forged, expired or the user was removed
+    def verify_token(self, token, now=None):
+        if not token or token.count('.') != 1:
+            return None
+        payload, signature = token.split('.')
+        if not hmac.compare_digest(signature.encode('utf-8'), self._sign(payload).encode('utf-8')):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or claims.get('exp', 0) <= (now or time.time()):
+            return None
+        if claims.get('sub') not in self._users():
+            return None
+        return claims['sub']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage bid tracker logins")
+    parser.add_argument('--credentials', default=CREDENTIALS_PATH, help="Credentials YAML file")
+    parser.add_argument('--rounds', type=int, default=BCRYPT_ROUNDS, help="bcrypt cost factor")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    add_parser = subcommands.add_parser('add-user', help="Add a user or reset their password")
+    add_parser.add_argument('email')
+    add_parser.add_argument('--name', default='')
+    remove_parser = subcommands.add_parser('remove-user', help="Remove a user")
+    remove_parser.add_argument('email')
+    subcommands.add_parser('list-users', help="List users")
+    args = parser.parse_args(argv)
+
+    store = CredentialStore(args.credentials, rounds=args.rounds)
+    if args.command == 'add-user':
+        password = getpass.getpass("Password: ")
+        if not password or password != getpass.getpass("Repeat password: "):
+            print("Passwords are empty or do not match", file=sys.stderr)
+            return 1
+        store.add_user(args.email, args.name, password)
+        print(f"Saved {args.email.strip().lower()}")
+    elif args.command == 'remove-user':
+        if not store.remove_user(args.email):
+            print(f"No user {args.email}", file=sys.stderr)
+            return 1
+        print(f"Removed {args.email.strip().lower()}")
+    else:
+        for email, name in store.users().items():
+            print(f"{email}\t{name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
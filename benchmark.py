@@ -0,0 +1,205 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from models import PRIORITIES, STATUSES
+from repository import ProjectRepository
+from storage import BinaryProjectStore, JsonProjectStore, LogProjectStore, SQLiteProjectStore
+
+# Benchmarks for load, save, update, search, filters, aggregates and page rendering on
+# synthetic portfolios. Results are printed (or written) as JSON for regression tracking:
+#   python benchmark.py --sizes 1000 10000 100000 --output bench_output.txt
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+STORE_KINDS = {
+    'sqlite': lambda directory: SQLiteProjectStore(os.path.join(directory, 'projects.db'), legacy_json_path=None),
+    'json': lambda directory: JsonProjectStore(os.path.join(directory, 'projects.json')),
+    'log': lambda directory: LogProjectStore(os.path.join(directory, 'projects.log')),
+    'binary': lambda directory: BinaryProjectStore(os.path.join(directory, 'projects.snap'), legacy_json_path=None),
+}
+
+_WORDS = ("bid proposal roofing hvac electrical plumbing renovation school hospital county city "
+          "bridge road paving water treatment solar retrofit lighting security network fiber "
+          "maintenance design build phase upgrade replacement annual service contract municipal "
+          "district federal state university airport transit library park facility campus").split()
+
+
+# A realistic-looking portfolio: skewed statuses and priorities, long free-text
+# descriptions, two years of created dates and deadlines up to six months out
+def generate_portfolio(size, seed=0):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    clients = [f"{rng.choice(_WORDS).title()} {rng.choice(['County', 'City', 'Schools', 'Health', 'Corp'])}"
+               for _ in range(max(size // 50, 10))]
+    projects = []
+    for i in range(size):
+        created = today - datetime.timedelta(days=rng.randint(0, 730))
+        projects.append({
+            'id': f"BENCH{i:07d}",
+            'title': ' '.join(rng.choices(_WORDS, k=rng.randint(3, 7))).title(),
+            'client': rng.choice(clients),
+            'description': ' '.join(rng.choices(_WORDS, k=rng.randint(20, 120))),
+            'drive_link': f"https://drive.google.com/file/d/{i:012d}" if rng.random() < 0.6 else '',
+            'status': rng.choices(STATUSES, weights=[5, 3, 2])[0],
+            'deadline': created + datetime.timedelta(days=rng.randint(7, 180)),
+            'value': rng.randrange(1000, 2_000_000, 1000),
+            'priority': rng.choices(PRIORITIES, weights=[3, 5, 2])[0],
+            'created_date': created,
+            'last_updated': datetime.datetime.combine(created, datetime.time(9)),
+        })
+    return projects
+
+
+# Run func `repeat` times and return the wall-clock seconds of each run
+def measure(func, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def _result(size, store, operation, runs):
+    return {
+        'size': size,
+        'store': store,
+        'operation': operation,
+        'median_s': statistics.median(runs),
+        'min_s': min(runs),
+        'runs_s': runs,
+    }
+
+
+def bench_store(kind, projects, repeat, directory):
+    size = len(projects)
+    results = []
+    store = STORE_KINDS[kind](directory)
+
+    results.append(_result(size, kind, 'save_all', measure(lambda: store.save_all(projects), repeat)))
+    results.append(_result(size, kind, 'load_all', measure(store.load_all, repeat)))
+
+    # Full repository load: read, parse into typed records, build indexes and aggregates
+    def load_repository():
+        repository = ProjectRepository(store)
+        repository.refresh()
+        return repository
+    results.append(_result(size, kind, 'repository_load', measure(load_repository, repeat)))
+
+    repository = load_repository()
+    rng = random.Random(1)
+
+    def update_one():
+        project = repository.get(projects[rng.randrange(size)]['id'])
+        repository.upsert(project.replace(status=rng.choice(STATUSES), last_updated=datetime.datetime.now()))
+    results.append(_result(size, kind, 'update_one', measure(update_one, repeat * 10)))
+    results.append(_result(size, kind, 'get_detail', measure(
+        lambda: repository.get(projects[rng.randrange(size)]['id']), repeat * 10)))
+
+    # The search index is built on the first search after a load; later searches reuse it
+    first_search = load_repository()
+    results.append(_result(size, kind, 'search_first', measure(lambda: first_search.match('hospital'), 1)))
+    repository.match('hospital')
+    results.append(_result(size, kind, 'search_word', measure(lambda: repository.match('hospital roofing'), repeat)))
+    results.append(_result(size, kind, 'search_substring', measure(lambda: repository.match('spit'), repeat)))
+    results.append(_result(size, kind, 'status_filter', measure(lambda: repository.match(None, 'Submitted'), repeat)))
+    results.append(_result(size, kind, 'aggregates', measure(repository.aggregates, repeat)))
+    results.append(_result(size, kind, 'deadline_outlook', measure(repository.deadline_outlook, repeat)))
+    results.append(_result(size, kind, 'aggregates_rebuild', measure(repository.rebuild_aggregates, 1)))
+    results.append(_result(size, kind, 'page_sorted', measure(lambda: repository.page('deadline', limit=25), repeat)))
+    results.append(_result(size, kind, 'page_filtered', measure(lambda: repository.page(
+        'value', descending=True, limit=25, ids=repository.match('hospital', 'Draft')), repeat)))
+    results.append(_result(size, kind, 'frame_build', measure(load_repository().frame, 1)))
+
+    writer_repository = ProjectRepository(store, write_behind=True)
+    writer_repository.refresh()
+
+    def update_write_behind():
+        project = writer_repository.get(projects[rng.randrange(size)]['id'])
+        writer_repository.upsert(project.replace(value=rng.randrange(1000, 2_000_000, 1000)))
+    results.append(_result(size, kind, 'update_one_write_behind', measure(update_write_behind, repeat * 10)))
+    results.append(_result(size, kind, 'write_behind_flush', measure(writer_repository.flush, 1)))
+    writer_repository.close()
+    return results
+
+
+# Page rendering through Streamlit's headless AppTest against a SQLite store of this size
+def bench_render(projects, repeat, directory):
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+
+    size = len(projects)
+    SQLiteProjectStore(os.path.join(directory, 'projects.db'), legacy_json_path=None).save_all(projects)
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bid_tracker_app.py')
+    results = []
+    previous_cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        st.cache_resource.clear()
+        app = AppTest.from_file(app_path, default_timeout=600)
+        app.session_state['authenticated'] = True
+        results.append(_result(size, 'sqlite', 'render_first_run', measure(app.run, 1)))
+        for page in ["Dashboard", "Edit Project", "Project Details", "Analytics"]:
+            app.sidebar.radio[0].set_value(page).run()
+            if app.exception:
+                raise RuntimeError(f"{page} failed: {app.exception[0].message}")
+            results.append(_result(size, 'sqlite', f"render_{page.lower().replace(' ', '_')}",
+                                   measure(app.run, repeat)))
+    finally:
+        os.chdir(previous_cwd)
+        st.cache_resource.clear()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bid tracker on synthetic portfolios")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--stores', nargs='+', choices=list(STORE_KINDS), default=list(STORE_KINDS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-render', action='store_true', help="Skip the Streamlit AppTest render timings")
+    parser.add_argument('--output', help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Pay the one-off pandas import up front so frame_build measures the build itself
+    import pandas  # noqa: F401
+
+    results = []
+    for size in args.sizes:
+        projects = generate_portfolio(size)
+        for kind in args.stores:
+            with tempfile.TemporaryDirectory() as directory:
+                results.extend(bench_store(kind, projects, args.repeat, directory))
+            print(f"{kind} {size}: done", file=sys.stderr)
+        if not args.no_render:
+            with tempfile.TemporaryDirectory() as directory:
+                results.extend(bench_render(projects, args.repeat, directory))
+            print(f"render {size}: done", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
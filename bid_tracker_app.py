@@ -1,11 +1,25 @@
 import streamlit as st
 import pandas as pd
-import random
-import string
+import cProfile
 import datetime
-from datetime import date
-import json
+import functools
+import io
 import os
+import pstats
+import time
+from datetime import date
+
+from auth import CredentialStore
+from bulk_io import FORMATS, ImportValidationError, detect_format, export_projects, import_projects, read_rows
+from instrumentation import metrics
+from models import PROJECT_FIELDS
+from portfolios import PORTFOLIOS, PortfolioSet, parse_portfolios
+from repository import ProjectRepository
+from service import ProjectService, ProjectValidationError
+from storage import VersionConflict, open_store
+
+# Start of this script run, for the rerun timings shown in the sidebar
+RUN_STARTED = time.perf_counter()
 
 # Page configuration
 st.set_page_config(
@@ -60,42 +74,140 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Dashboard list paging and sorting
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+SORT_OPTIONS = {"Created Date": "created_date", "Deadline": "deadline", "Value": "value"}
+
+# Analytics: upcoming-deadline windows (days) and how many clients to chart
+UPCOMING_WINDOWS = [7, 30, 90]
+TOP_CLIENTS = 10
+
+# Accounts that can open the Diagnostics page (comma-separated BID_TRACKER_ADMINS)
+ADMIN_EMAILS = {email.strip().lower() for email in
+                os.environ.get('BID_TRACKER_ADMINS', 'ermias@ketos.co').split(',') if email.strip()}
+PROFILE_DIR = os.environ.get('BID_TRACKER_PROFILE_DIR', 'profiles')
+
 # Initialize session state
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
-if 'projects' not in st.session_state:
-    st.session_state.projects = []
 
-# Authentication function
+# Per-session timings (ms) and rerun counts of full runs and of each fragment; also fed
+# into the process-wide rolling percentiles while diagnostics are enabled
+def record_run_time(scope, started):
+    elapsed = time.perf_counter() - started
+    st.session_state.setdefault('run_times', {})[scope] = elapsed * 1000
+    run_counts = st.session_state.setdefault('run_counts', {})
+    run_counts[scope] = run_counts.get(scope, 0) + 1
+    if metrics.enabled:
+        metrics.record(f"run.{scope}", elapsed)
+
+# st.fragment that also records how long each of its runs takes
+def timed_fragment(func):
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_run_time(func.__name__, started)
+    return st.fragment(timed)
+
+# One credential store per server process (the YAML file is re-read only when it changes)
+@st.cache_resource
+def get_credentials():
+    return CredentialStore()
+
+# Authentication function (bcrypt check against the credentials file)
 def authenticate(email, password):
-    return email == "ermias@ketos.co" and password == "18221822"
+    return get_credentials().verify_password(email, password)
 
-# Generate project ID (first one is QB6TYKDHVWL9, then random)
-def generate_project_id():
-    # Check if this is the first project
-    if not st.session_state.projects:
-        return "QB6TYKDHVWL9"
-    else:
-        # Generate random ID for subsequent projects
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=12))
+# Log back in from the signed session cookie after a browser refresh: one HMAC check, no bcrypt
+def restore_session():
+    if st.session_state.get('logged_out'):
+        return
+    credentials = get_credentials()
+    email = credentials.verify_token(st.context.cookies.get(credentials.cookie_name))
+    if email is not None:
+        st.session_state.authenticated = True
+        st.session_state.user_email = email
 
-# Load projects from file (simulate cloud storage)
-def load_projects():
-    try:
-        if os.path.exists('projects.json'):
-            with open('projects.json', 'r') as f:
-                return json.load(f)
-    except:
-        pass
-    return []
-
-# Save projects to file (simulate cloud storage)
-def save_projects(projects):
+# Write or expire the session cookie in the browser. This runs on the run after login or
+# logout, so the cookie component is on the page instead of being cut off by st.rerun().
+def sync_session_cookie():
+    action = st.session_state.pop('cookie_action', None)
+    if action is None:
+        return
     try:
-        with open('projects.json', 'w') as f:
-            json.dump(projects, f, indent=2, default=str)
-    except:
-        pass
+        import extra_streamlit_components as stx
+    except ImportError:
+        # Installed with streamlit-authenticator; without it sessions end with the browser tab
+        return
+    credentials = get_credentials()
+    if action == 'set':
+        token = credentials.issue_token(st.session_state.user_email)
+        expires_at = datetime.datetime.now() + datetime.timedelta(days=credentials.expiry_days)
+    else:
+        token, expires_at = '', datetime.datetime(1970, 1, 1)
+    stx.CookieManager(key='session_cookie').set(credentials.cookie_name, token, key='session_cookie_set',
+                                                expires_at=expires_at)
+
+def is_admin():
+    return st.session_state.get('user_email', '').lower() in ADMIN_EMAILS
+
+# Writes are persisted in the background unless BID_TRACKER_WRITE_BEHIND=0
+def write_behind_enabled():
+    return os.environ.get('BID_TRACKER_WRITE_BEHIND', '1') != '0'
+
+# One project repository per server process, shared by every browser session
+@st.cache_resource
+def get_store_repository():
+    return ProjectRepository(open_store(), write_behind=write_behind_enabled())
+
+# Business-unit portfolios from BID_TRACKER_PORTFOLIOS, mounted once per server process
+# (None when the app runs on a single store)
+@st.cache_resource
+def get_portfolios():
+    paths = parse_portfolios(PORTFOLIOS)
+    if not paths:
+        return None
+    return PortfolioSet(paths, write_behind=write_behind_enabled(), windows=UPCOMING_WINDOWS)
+
+# The repository of the business unit picked in the sidebar (or of the single store)
+def get_repository():
+    portfolios = get_portfolios()
+    if portfolios is None:
+        return get_store_repository()
+    name = st.session_state.get('portfolio')
+    return portfolios.repository(name if name in portfolios.paths else portfolios.names()[0])
+
+# Session-state key for per-project UI state; IDs are only unique within one portfolio
+def project_key(kind, project_id):
+    return f"{kind}:{st.session_state.get('portfolio', '')}:{project_id}"
+
+# Validation, timestamps and status changes live in the Streamlit-free service layer
+def get_service():
+    return ProjectService(get_repository())
+
+# Generate project ID (first one is QB6TYKDHVWL9, then random and collision-checked)
+def generate_project_id():
+    return get_repository().new_id()
+
+# Look up a single project by ID
+def get_project(project_id):
+    return get_repository().get(project_id)
+
+# Remove a single project from storage; returns a FlushTicket for the background write
+def delete_project(project_id, expected_version=None):
+    return get_repository().delete(project_id, expected_version=expected_version)
+
+# The copy of a project this session is editing from, kept across reruns so a save can
+# tell whether someone else changed the project in the meantime (refresh=True re-reads it)
+def edit_base(project_id, refresh=False):
+    key = project_key('edit_base', project_id)
+    if refresh or key not in st.session_state:
+        st.session_state[key] = get_project(project_id)
+    return st.session_state[key]
 
 # Login page
 def login_page():
@@ -114,6 +226,9 @@ def login_page():
             if login_button:
                 if authenticate(email, password):
                     st.session_state.authenticated = True
+                    st.session_state.user_email = email.strip().lower()
+                    st.session_state.logged_out = False
+                    st.session_state.cookie_action = 'set'
                     st.success("Login successful! Redirecting...")
                     st.rerun()
                 else:
@@ -121,44 +236,85 @@ def login_page():
 
 # Main dashboard
 def main_dashboard():
-    # Load projects on startup
-    if not st.session_state.projects:
-        st.session_state.projects = load_projects()
-    
     # Header
     st.markdown('<h1 class="main-header">📊 Project Bid Tracker Dashboard</h1>', unsafe_allow_html=True)
     
     # Sidebar
     with st.sidebar:
+        portfolios = get_portfolios()
+        if portfolios is not None:
+            st.selectbox("Business Unit", portfolios.names(), key='portfolio')
+        
         st.markdown("### Navigation")
-        page = st.radio("Select Page", ["Dashboard", "Add New Project", "Edit Project", "Project Details", "Analytics"])
+        pages = ["Dashboard", "Add New Project", "Edit Project", "Project Details", "Analytics", "Import / Export"]
+        if portfolios is not None and len(portfolios.names()) > 1:
+            pages.insert(1, "Company Overview")
+        if is_admin():
+            pages.append("Diagnostics")
+        page = st.radio("Select Page", pages)
+        
+        # Background saves never block the page, so failures are reported here
+        write_error = get_repository().write_error()
+        if write_error is not None:
+            st.error(f"Saving to storage is failing ({write_error}). Your changes are kept and will be retried.")
         
         st.markdown("---")
+        with st.expander("⏱️ Rerun Timing"):
+            # Interactions inside a fragment only pay for that fragment, not the full run
+            for scope, elapsed in st.session_state.get('run_times', {}).items():
+                st.caption(f"{scope}: {elapsed:.1f} ms")
+        
         if st.button("Logout"):
             st.session_state.authenticated = False
+            st.session_state.pop('user_email', None)
+            st.session_state.logged_out = True
+            st.session_state.cookie_action = 'clear'
             st.rerun()
     
-    if page == "Dashboard":
-        dashboard_page()
-    elif page == "Add New Project":
-        add_project_page()
-    elif page == "Edit Project":
-        edit_project_page()
-    elif page == "Project Details":
-        project_details_page()
-    elif page == "Analytics":
-        analytics_page()
+    with metrics.timer(f"page.{page}"):
+        if page == "Dashboard":
+            dashboard_page()
+        elif page == "Company Overview":
+            company_overview_page()
+        elif page == "Add New Project":
+            add_project_page()
+        elif page == "Edit Project":
+            edit_project_page()
+        elif page == "Project Details":
+            project_details_page()
+        elif page == "Analytics":
+            analytics_page()
+        elif page == "Import / Export":
+            import_export_page()
+        elif page == "Diagnostics":
+            diagnostics_page()
 
 def dashboard_page():
     st.markdown("## 📋 Project Overview")
+    aggregates = get_repository().aggregates(['status'])
+    status_metrics(aggregates)
+    
+    st.markdown("---")
+    
+    # Projects table
+    if aggregates['count']:
+        st.markdown("## 📊 All Projects")
+        
+        dashboard_project_list()
+    else:
+        st.info("No projects found. Add your first project using the 'Add New Project' page!")
+
+# Total and per-status project counts from the status rollup
+def status_metrics(aggregates):
+    status_counts = aggregates['counts']['status']
     
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
     
-    total_projects = len(st.session_state.projects)
-    submitted_projects = len([p for p in st.session_state.projects if p['status'] == 'Submitted'])
-    draft_projects = len([p for p in st.session_state.projects if p['status'] == 'Draft'])
-    pending_projects = len([p for p in st.session_state.projects if p['status'] == 'Pending Response'])
+    total_projects = aggregates['count']
+    submitted_projects = status_counts.get('Submitted', 0)
+    draft_projects = status_counts.get('Draft', 0)
+    pending_projects = status_counts.get('Pending Response', 0)
     
     with col1:
         st.metric("Total Projects", total_projects)
@@ -168,51 +324,85 @@ def dashboard_page():
         st.metric("Drafts", draft_projects)
     with col4:
         st.metric("Pending Response", pending_projects)
+
+# Every business unit at once: rollups merged from each portfolio, with cold portfolios
+# loaded in parallel worker processes (so this takes about as long as the largest one)
+def company_overview_page():
+    st.markdown("## 🏢 Company Overview")
+    view = get_portfolios().combined()
+    status_metrics(view.aggregates(['status']))
     
     st.markdown("---")
+    st.markdown("### 🗂️ By Business Unit")
+    breakdown = pd.DataFrame(view.breakdown())
+    breakdown = breakdown.rename(columns={'portfolio': 'Business Unit', 'projects': 'Projects',
+                                          'value': 'Pipeline Value ($)', 'overdue': 'Overdue'})
+    st.dataframe(breakdown, use_container_width=True, hide_index=True)
     
-    # Projects table
-    if st.session_state.projects:
-        st.markdown("## 📊 All Projects")
-        
-        # Search and filter
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            search_term = st.text_input("🔍 Search projects", placeholder="Search by title or ID...")
-        with col2:
-            status_filter = st.selectbox("Filter by Status", ["All", "Draft", "Submitted", "Pending Response"])
-        
-        # Filter projects
-        filtered_projects = st.session_state.projects
-        
-        if search_term:
-            filtered_projects = [p for p in filtered_projects 
-                               if search_term.lower() in p['title'].lower() or search_term.lower() in p['id'].lower()]
-        
-        if status_filter != "All":
-            filtered_projects = [p for p in filtered_projects if p['status'] == status_filter]
-        
-        # Display projects
-        for project in filtered_projects:
-            with st.expander(f"**{project['id']}** - {project['title']}", expanded=False):
-                col1, col2, col3 = st.columns([2, 1, 1])
-                
-                with col1:
-                    st.write(f"**Description:** {project['description']}")
-                    st.write(f"**Client:** {project['client']}")
-                    if project['drive_link']:
-                        st.markdown(f"**Google Drive:** [Open Document]({project['drive_link']})")
-                
-                with col2:
-                    status_class = f"status-{project['status'].lower().replace(' ', '-')}"
-                    st.markdown(f'<div class="{status_class}">{project["status"]}</div>', unsafe_allow_html=True)
-                    st.write(f"**Created:** {project['created_date']}")
-                
-                with col3:
-                    st.write(f"**Deadline:** {project['deadline']}")
-                    st.write(f"**Value:** ${project['value']:,}")
+    st.markdown("---")
+    analytics_panel(view)
+
+# Search, sort and paging only re-run this fragment, not the whole app
+@timed_fragment
+def dashboard_project_list():
+    # Search and filter
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        search_term = st.text_input("🔍 Search projects", placeholder="Search by title, ID, client or description...")
+    with col2:
+        status_filter = st.selectbox("Filter by Status", ["All", "Draft", "Submitted", "Pending Response"])
+    
+    # Sorting and paging
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sort_label = st.selectbox("Sort by", list(SORT_OPTIONS))
+    with col2:
+        descending = st.radio("Order", ["Descending", "Ascending"], horizontal=True) == "Descending"
+    with col3:
+        page_size = st.selectbox("Projects per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+    
+    # Filter projects through the search index and per-status ID sets (None means no filter)
+    matching_ids = get_repository().match(search_term or None,
+                                          None if status_filter == "All" else status_filter)
+    
+    total_matches = len(get_repository()) if matching_ids is None else len(matching_ids)
+    page_count = max((total_matches + page_size - 1) // page_size, 1)
+    # Keyed on the filters so the page number resets whenever the result set changes
+    page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1,
+                                  key=f"dashboard_page:{search_term}:{status_filter}:{page_size}")
+    
+    _, filtered_projects = get_repository().page(
+        SORT_OPTIONS[sort_label], descending=descending,
+        offset=(page_number - 1) * page_size, limit=page_size, ids=matching_ids)
+    # Descriptions and links only for the projects on this page
+    filtered_projects = get_repository().expand(filtered_projects)
+    
+    if total_matches:
+        first = (page_number - 1) * page_size + 1
+        st.caption(f"Showing {first}–{first + len(filtered_projects) - 1} of {total_matches} matching projects "
+                   f"(page {page_number} of {page_count})")
     else:
-        st.info("No projects found. Add your first project using the 'Add New Project' page!")
+        st.info("No projects match your search.")
+    
+    # Display projects
+    for project in filtered_projects:
+        with st.expander(f"**{project['id']}** - {project['title']}", expanded=False):
+            col1, col2, col3 = st.columns([2, 1, 1])
+    
+            with col1:
+                st.write(f"**Description:** {project['description']}")
+                st.write(f"**Client:** {project['client']}")
+                if project['drive_link']:
+                    st.markdown(f"**Google Drive:** [Open Document]({project['drive_link']})")
+    
+            with col2:
+                status_class = f"status-{project['status'].lower().replace(' ', '-')}"
+                st.markdown(f'<div class="{status_class}">{project["status"]}</div>', unsafe_allow_html=True)
+                st.write(f"**Created:** {project['created_date']}")
+    
+            with col3:
+                st.write(f"**Deadline:** {project['deadline']}")
+                st.write(f"**Value:** ${project['value']:,}")
 
 def add_project_page():
     st.markdown("## ➕ Add New Project")
@@ -240,156 +430,198 @@ def add_project_page():
         submitted = st.form_submit_button("Add Project", use_container_width=True)
         
         if submitted:
-            if title and client:
-                new_project = {
-                    'id': project_id,
-                    'title': title,
-                    'client': client,
-                    'description': description,
-                    'drive_link': drive_link,
-                    'status': status,
-                    'deadline': deadline,
-                    'value': value,
-                    'priority': priority,
-                    'created_date': created_date,
-                    'last_updated': datetime.datetime.now()
-                }
-                
-                st.session_state.projects.append(new_project)
-                save_projects(st.session_state.projects)
-                
+            new_project = {
+                'id': project_id,
+                'title': title,
+                'client': client,
+                'description': description,
+                'drive_link': drive_link,
+                'status': status,
+                'deadline': deadline,
+                'value': value,
+                'priority': priority,
+                'created_date': created_date,
+            }
+            
+            try:
+                get_service().create_project(new_project, wait=True)
+            except ProjectValidationError as e:
+                st.error(f"Please fill in all required fields (marked with *): {e}")
+            except VersionConflict:
+                st.error("That project ID was just taken by another project. Please submit again.")
+            else:
                 st.success(f"✅ Project {project_id} added successfully!")
                 st.balloons()
-            else:
-                st.error("Please fill in all required fields (marked with *)")
 
 def edit_project_page():
     st.markdown("## ✏️ Edit Project")
     
-    if not st.session_state.projects:
+    if len(get_repository()) == 0:
         st.info("No projects available to edit. Add a project first!")
         return
     
     # Select project to edit
-    project_options = [f"{p['id']} - {p['title']}" for p in st.session_state.projects]
+    project_options = get_repository().labels()
     selected_project = st.selectbox("Select Project to Edit", project_options)
     
     if selected_project:
         # Find the selected project
         project_id = selected_project.split(' - ')[0]
-        project_index = next((i for i, p in enumerate(st.session_state.projects) if p['id'] == project_id), None)
+        edit_project_panel(project_id)
+
+# Editing re-runs only this fragment; picking another project re-runs the page
+@timed_fragment
+def edit_project_panel(project_id):
+    current = get_project(project_id)
+    if current is None:
+        st.warning("This project no longer exists.")
+        return
+    # The form shows the version this session started editing, not whatever is newest
+    project = edit_base(project_id)
+    conflict_key = project_key('edit_conflict', project_id)
+    
+    st.markdown(f"### Editing Project: `{project['id']}`")
+    if current.version != project.version and conflict_key not in st.session_state:
+        st.warning("Someone else has saved this project since you opened it.")
+        if st.button("🔄 Load latest version"):
+            edit_base(project_id, refresh=True)
+            st.rerun()
+    
+    with st.form("edit_project_form"):
+        col1, col2 = st.columns(2)
         
-        if project_index is not None:
-            project = st.session_state.projects[project_index]
-            
-            st.markdown(f"### Editing Project: `{project['id']}`")
-            
-            with st.form("edit_project_form"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Convert date strings back to date objects if needed
-                    if isinstance(project['created_date'], str):
-                        created_date_value = datetime.datetime.strptime(project['created_date'], '%Y-%m-%d').date()
-                    else:
-                        created_date_value = project['created_date']
-                    
-                    title = st.text_input("Project Title*", value=project['title'])
-                    client = st.text_input("Client Name*", value=project['client'])
-                    description = st.text_area("Project Description", value=project['description'])
-                    drive_link = st.text_input("Google Drive Link", value=project['drive_link'])
-                    created_date = st.date_input("Created Date", value=created_date_value)
-                
-                with col2:
-                    status = st.selectbox("Status", 
-                                        ["Draft", "Submitted", "Pending Response"], 
-                                        index=["Draft", "Submitted", "Pending Response"].index(project['status']))
-                    
-                    # Convert deadline string back to date object if needed
-                    if isinstance(project['deadline'], str):
-                        deadline_value = datetime.datetime.strptime(project['deadline'], '%Y-%m-%d').date()
-                    else:
-                        deadline_value = project['deadline']
-                    
-                    deadline = st.date_input("Deadline", value=deadline_value)
-                    value = st.number_input("Project Value ($)", value=project['value'], min_value=0, step=1000)
-                    priority = st.selectbox("Priority", 
-                                          ["Low", "Medium", "High"], 
-                                          index=["Low", "Medium", "High"].index(project['priority']))
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    update_button = st.form_submit_button("💾 Update Project", use_container_width=True)
-                with col2:
-                    cancel_button = st.form_submit_button("❌ Cancel", use_container_width=True)
-                
-                if update_button:
-                    if title and client:
-                        # Update the project
-                        updated_project = {
-                            'id': project['id'],  # Keep the same ID
-                            'title': title,
-                            'client': client,
-                            'description': description,
-                            'drive_link': drive_link,
-                            'status': status,
-                            'deadline': deadline,
-                            'value': value,
-                            'priority': priority,
-                            'created_date': created_date,
-                            'last_updated': datetime.datetime.now()
-                        }
-                        
-                        st.session_state.projects[project_index] = updated_project
-                        save_projects(st.session_state.projects)
-                        
-                        st.success(f"✅ Project {project['id']} updated successfully!")
-                        st.balloons()
-                    else:
-                        st.error("Please fill in all required fields (marked with *)")
-                
-                if cancel_button:
-                    st.info("Edit cancelled. No changes were made.")
-            
-            # Show comparison of changes
-            st.markdown("---")
-            st.markdown("### 📊 Current Project Details")
+        with col1:
+            title = st.text_input("Project Title*", value=project['title'])
+            client = st.text_input("Client Name*", value=project['client'])
+            description = st.text_area("Project Description", value=project['description'])
+            drive_link = st.text_input("Google Drive Link", value=project['drive_link'])
+            created_date = st.date_input("Created Date", value=project['created_date'])
+        
+        with col2:
+            status = st.selectbox("Status", 
+                                ["Draft", "Submitted", "Pending Response"], 
+                                index=["Draft", "Submitted", "Pending Response"].index(project['status']))
             
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**Current Information:**")
-                st.write(f"• **Title:** {project['title']}")
-                st.write(f"• **Client:** {project['client']}")
-                st.write(f"• **Status:** {project['status']}")
-                st.write(f"• **Value:** ${project['value']:,}")
-                st.write(f"• **Priority:** {project['priority']}")
+            deadline = st.date_input("Deadline", value=project['deadline'])
+            value = st.number_input("Project Value ($)", value=project['value'], min_value=0, step=1000)
+            priority = st.selectbox("Priority", 
+                                  ["Low", "Medium", "High"], 
+                                  index=["Low", "Medium", "High"].index(project['priority']))
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            update_button = st.form_submit_button("💾 Update Project", use_container_width=True)
+        with col2:
+            cancel_button = st.form_submit_button("❌ Cancel", use_container_width=True)
+        
+        if update_button:
+            changes = {
+                'title': title,
+                'client': client,
+                'description': description,
+                'drive_link': drive_link,
+                'status': status,
+                'deadline': deadline,
+                'value': value,
+                'priority': priority,
+                'created_date': created_date,
+            }
             
-            with col2:
-                st.markdown("**Dates:**")
-                st.write(f"• **Created:** {project['created_date']}")
-                st.write(f"• **Deadline:** {project['deadline']}")
-                if 'last_updated' in project:
-                    last_updated = project['last_updated']
-                    if isinstance(last_updated, str):
-                        st.write(f"• **Last Updated:** {last_updated}")
-                    else:
-                        st.write(f"• **Last Updated:** {last_updated.strftime('%Y-%m-%d %H:%M:%S')}")
+            try:
+                get_service().update_project(project_id, changes, expected_version=project.version, wait=True)
+            except ProjectValidationError as e:
+                st.error(f"Please fill in all required fields (marked with *): {e}")
+            except VersionConflict:
+                st.session_state[conflict_key] = changes
+            else:
+                edit_base(project_id, refresh=True)
+                st.success(f"✅ Project {project['id']} updated successfully!")
+                st.balloons()
+        
+        if cancel_button:
+            st.info("Edit cancelled. No changes were made.")
+    
+    if conflict_key in st.session_state:
+        edit_conflict_panel(project_id, st.session_state[conflict_key])
+    
+    # Show comparison of changes (re-read so a save in this run shows up)
+    project = get_project(project_id)
+    st.markdown("---")
+    st.markdown("### 📊 Current Project Details")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Current Information:**")
+        st.write(f"• **Title:** {project['title']}")
+        st.write(f"• **Client:** {project['client']}")
+        st.write(f"• **Status:** {project['status']}")
+        st.write(f"• **Value:** ${project['value']:,}")
+        st.write(f"• **Priority:** {project['priority']}")
+    
+    with col2:
+        st.markdown("**Dates:**")
+        st.write(f"• **Created:** {project['created_date']}")
+        st.write(f"• **Deadline:** {project['deadline']}")
+        if project['last_updated']:
+            st.write(f"• **Last Updated:** {project['last_updated'].strftime('%Y-%m-%d %H:%M:%S')}")
+
+# A save that lost the race: show what differs and let the user keep either side
+def edit_conflict_panel(project_id, mine):
+    current = get_project(project_id)
+    if current is None:
+        st.session_state.pop(project_key('edit_conflict', project_id), None)
+        st.error("Someone else deleted this project while you were editing it.")
+        return
+    
+    st.error(f"Someone else saved this project while you were editing it "
+             f"(it is now at version {current.version}). Your changes have not been saved.")
+    differences = [
+        {'Field': field.replace('_', ' ').title(),
+         'Your Change': str(mine[field]),
+         'Saved Version': str(current[field])}
+        for field in PROJECT_FIELDS[1:] if field != 'last_updated' and mine[field] != current[field]
+    ]
+    if differences:
+        st.dataframe(pd.DataFrame(differences), use_container_width=True, hide_index=True)
+    else:
+        st.info("The saved version already matches your changes.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        overwrite_button = st.button("💾 Overwrite with my changes", use_container_width=True)
+    with col2:
+        discard_button = st.button("↩️ Discard my changes", use_container_width=True)
+    
+    if overwrite_button:
+        try:
+            get_service().update_project(project_id, mine, expected_version=current.version, wait=True)
+        except VersionConflict:
+            # Changed yet again; the next run shows the newer version
+            st.rerun()
+        st.session_state.pop(project_key('edit_conflict', project_id), None)
+        edit_base(project_id, refresh=True)
+        st.toast(f"✅ Project {project_id} updated with your changes.")
+        st.rerun()
+    if discard_button:
+        st.session_state.pop(project_key('edit_conflict', project_id), None)
+        edit_base(project_id, refresh=True)
+        st.rerun()
 
 def project_details_page():
     st.markdown("## 📝 Project Details & Management")
     
-    if not st.session_state.projects:
+    if len(get_repository()) == 0:
         st.info("No projects available. Add a project first!")
         return
     
     # Select project
-    project_options = [f"{p['id']} - {p['title']}" for p in st.session_state.projects]
+    project_options = get_repository().labels()
     selected_project = st.selectbox("Select Project", project_options)
     
     if selected_project:
         # Find the selected project
         project_id = selected_project.split(' - ')[0]
-        project = next((p for p in st.session_state.projects if p['id'] == project_id), None)
+        project = get_project(project_id)
         
         if project:
             col1, col2 = st.columns([2, 1])
@@ -404,26 +636,7 @@ def project_details_page():
                     st.markdown(f"**Google Drive:** [Open Document]({project['drive_link']})")
             
             with col2:
-                st.markdown("### Quick Actions")
-                
-                # Update status
-                new_status = st.selectbox("Update Status", 
-                                        ["Draft", "Submitted", "Pending Response"], 
-                                        index=["Draft", "Submitted", "Pending Response"].index(project['status']))
-                
-                if st.button("Update Status"):
-                    project['status'] = new_status
-                    project['last_updated'] = datetime.datetime.now()
-                    save_projects(st.session_state.projects)
-                    st.success("Status updated!")
-                    st.rerun()
-                
-                # Delete project
-                if st.button("🗑️ Delete Project", type="secondary"):
-                    st.session_state.projects = [p for p in st.session_state.projects if p['id'] != project_id]
-                    save_projects(st.session_state.projects)
-                    st.success("Project deleted!")
-                    st.rerun()
+                project_quick_actions(project_id)
             
             # Project timeline
             st.markdown("---")
@@ -435,18 +648,78 @@ def project_details_page():
             with col2:
                 st.metric("Deadline", str(project['deadline']))
             with col3:
-                # Handle date conversion for days remaining calculation
-                if isinstance(project['deadline'], str):
-                    deadline_date = datetime.datetime.strptime(project['deadline'], '%Y-%m-%d').date()
-                else:
-                    deadline_date = project['deadline']
-                days_remaining = (deadline_date - date.today()).days
-                st.metric("Days Remaining", days_remaining)
+                st.metric("Days Remaining", project.days_remaining())
+            
+            # Change history straight from the store's change log
+            st.markdown("---")
+            st.markdown("### 📜 Change History")
+            history = get_repository().history(project_id)
+            if history is None:
+                st.caption("Change history is recorded by the change-log storage engine (BID_TRACKER_STORAGE=log).")
+            elif not history:
+                st.caption("No changes recorded yet.")
+            for event in history or []:
+                st.write(f"• **{event['at'].replace('T', ' ')}** — {describe_change(event)}")
+
+# One line of the change history, e.g. "Status Draft → Submitted; also changed value"
+def describe_change(event):
+    if event['type'] == 'create':
+        return "Created"
+    if event['type'] == 'delete':
+        return "Deleted"
+    changed = [field.replace('_', ' ') for field in event['changes'] if field not in ('status', 'last_updated')]
+    if event['type'] == 'status':
+        summary = f"Status {event['from']} → {event['changes']['status']}"
+        return f"{summary}; also changed {', '.join(changed)}" if changed else summary
+    return f"Changed {', '.join(changed)}" if changed else "Saved without changes"
+
+# Status changes re-run only this panel
+@timed_fragment
+def project_quick_actions(project_id):
+    project = get_project(project_id)
+    if project is None:
+        return
+    
+    st.markdown("### Quick Actions")
+    
+    # Update status
+    new_status = st.selectbox("Update Status", 
+                            ["Draft", "Submitted", "Pending Response"], 
+                            index=["Draft", "Submitted", "Pending Response"].index(project['status']))
+    
+    # Version shown on the previous run, so a change made elsewhere before the click is not overwritten
+    shown_key = project_key('status_base', project_id)
+    shown_version = st.session_state.get(shown_key, project.version)
+    
+    if st.button("Update Status"):
+        try:
+            get_service().set_status(project_id, new_status, expected_version=shown_version, wait=True)
+        except VersionConflict:
+            st.warning("Someone else changed this project just now; check its status and try again.")
+        else:
+            # Our own save, so an open edit form can start from it without a conflict warning
+            st.session_state.pop(project_key('edit_base', project_id), None)
+            # The click already re-ran just this fragment, so no st.rerun() is needed
+            st.success("Status updated!")
+    st.session_state[shown_key] = get_project(project_id).version
+    
+    # Delete project
+    if st.button("🗑️ Delete Project", type="secondary"):
+        delete_project(project_id)
+        st.success("Project deleted!")
+        # The whole page changes once the project is gone
+        st.rerun()
 
 def analytics_page():
     st.markdown("## 📈 Analytics & Insights")
+    analytics_panel(get_repository())
+
+# Charts and outlook for anything with the repository's read methods: one portfolio's
+# ProjectRepository or the company-wide CombinedView
+def analytics_panel(source):
+    aggregates = source.aggregates()
     
-    if not st.session_state.projects:
+    if not aggregates['count']:
         st.info("No projects available for analytics. Add some projects first!")
         return
     
@@ -455,10 +728,7 @@ def analytics_page():
     
     with col1:
         st.markdown("### 📊 Project Status Distribution")
-        status_counts = {}
-        for project in st.session_state.projects:
-            status = project['status']
-            status_counts[status] = status_counts.get(status, 0) + 1
+        status_counts = aggregates['counts']['status']
         
         if status_counts:
             df_status = pd.DataFrame(list(status_counts.items()), columns=['Status', 'Count'])
@@ -466,27 +736,75 @@ def analytics_page():
     
     with col2:
         st.markdown("### 💰 Total Project Value")
-        total_value = sum(p['value'] for p in st.session_state.projects)
+        total_value = aggregates['total_value']
         st.metric("Total Portfolio Value", f"${total_value:,}")
         
         # Value by status
-        value_by_status = {}
-        for project in st.session_state.projects:
-            status = project['status']
-            value_by_status[status] = value_by_status.get(status, 0) + project['value']
+        value_by_status = aggregates['values']['status']
         
         st.markdown("**Value by Status:**")
         for status, value in value_by_status.items():
             st.write(f"• {status}: ${value:,}")
     
+    # Deadline outlook from the per-day deadline rollup (no scan of the portfolio)
+    st.markdown("---")
+    st.markdown("### ⏳ Deadline Outlook")
+    outlook = source.deadline_outlook(UPCOMING_WINDOWS)
+    
+    columns = st.columns(len(UPCOMING_WINDOWS) + 2)
+    labels = [("Overdue", 'overdue')] + [(f"Due in {days} Days", days) for days in UPCOMING_WINDOWS] + \
+             [("No Deadline", 'no_deadline')]
+    for column, (label, key) in zip(columns, labels):
+        count, value = outlook[key]
+        with column:
+            st.metric(label, count)
+            st.caption(f"${value:,}")
+    
+    # Pipeline over time from the weekly/monthly rollups; the charts grow with the
+    # number of buckets, not with the number of projects
+    st.markdown("---")
+    st.markdown("### 📅 Pipeline Over Time")
+    col1, col2 = st.columns(2)
+    with col1:
+        bucket = st.radio("Bucket", ["Monthly", "Weekly"], horizontal=True)
+    with col2:
+        date_field = st.radio("Date", ["Created Date", "Deadline"], horizontal=True)
+    group = ('created' if date_field == "Created Date" else 'deadline') + \
+            ('_month' if bucket == "Monthly" else '_week')
+    bucket_values = aggregates['values'][group]
+    if bucket_values:
+        df_pipeline = pd.DataFrame({
+            'Value ($)': pd.Series(bucket_values),
+            'Projects': pd.Series(aggregates['counts'][group]),
+        }).sort_index()
+        df_pipeline.index = pd.to_datetime(df_pipeline.index)
+        st.bar_chart(df_pipeline['Value ($)'])
+        st.caption(f"{len(df_pipeline)} {bucket.lower()} buckets, {int(df_pipeline['Projects'].sum())} dated projects")
+    else:
+        st.info(f"No projects have a {date_field.lower()} yet.")
+    
+    # Value by client and priority
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 🏢 Top Clients by Value")
+        client_values = aggregates['values']['client']
+        top_clients = sorted(client_values.items(), key=lambda item: item[1], reverse=True)[:TOP_CLIENTS]
+        if top_clients:
+            st.bar_chart(pd.DataFrame(top_clients, columns=['Client', 'Value ($)']).set_index('Client'))
+    with col2:
+        st.markdown("### 🎯 Value by Priority")
+        priority_values = aggregates['values']['priority']
+        df_priority = pd.DataFrame([(priority, priority_values.get(priority, 0))
+                                    for priority in ["Low", "Medium", "High"]], columns=['Priority', 'Value ($)'])
+        st.bar_chart(df_priority.set_index('Priority'))
+    
     # Recent activity
     st.markdown("---")
     st.markdown("### 🕐 Recent Projects")
     
-    # Sort projects by creation date
-    recent_projects = sorted(st.session_state.projects, 
-                           key=lambda x: x['created_date'], 
-                           reverse=True)[:5]
+    # Newest projects straight from the created-date index
+    recent_projects = source.recent(5)
     
     for project in recent_projects:
         col1, col2, col3 = st.columns([2, 1, 1])
@@ -497,12 +815,126 @@ def analytics_page():
         with col3:
             st.write(f"${project['value']:,}")
 
-# Main app logic
-def main():
+def import_export_page():
+    st.markdown("## 📦 Import / Export")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("### ⬆️ Import Projects")
+        st.caption("CSV, JSON Lines or Parquet with the same fields as the Add New Project form. "
+                   "Rows without an ID get a new one; the whole file is saved in one transaction.")
+        uploaded_file = st.file_uploader("Project file", type=['csv', 'jsonl', 'json', 'ndjson', 'parquet'])
+        skip_invalid = st.checkbox("Skip invalid rows instead of aborting the import")
+        
+        if uploaded_file is not None and st.button("Import Projects", use_container_width=True):
+            try:
+                rows = read_rows(uploaded_file, detect_format(uploaded_file.name))
+                report = import_projects(get_repository(), rows, skip_invalid=skip_invalid)
+            except ImportValidationError as e:
+                st.error(f"Import aborted, nothing was saved. {e}")
+            except (ValueError, ImportError) as e:
+                st.error(f"Could not read {uploaded_file.name}: {e}")
+            else:
+                st.success(f"✅ Imported {report['imported']} projects ({len(report['skipped'])} skipped)")
+                for row_number, errors in report['skipped'][:20]:
+                    st.write(f"• Row {row_number}: {'; '.join(errors)}")
+    
+    with col2:
+        st.markdown("### ⬇️ Export Projects")
+        export_format = st.selectbox("Format", FORMATS)
+        
+        if st.button("Prepare Export", use_container_width=True):
+            get_repository().flush()
+            buffer = io.BytesIO()
+            count = export_projects(get_repository().store, buffer, export_format)
+            st.download_button(f"Download {count} projects", data=buffer.getvalue(),
+                               file_name=f"projects.{export_format}", on_click="ignore",
+                               use_container_width=True)
+
+# Admin-only view of the process-wide latency percentiles, storage traffic and this session's reruns
+def diagnostics_page():
+    st.markdown("## 🩺 Diagnostics")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        # Shared by every session; timers cost one attribute check while this is off
+        metrics.enabled = st.toggle("Collect timings for all sessions", value=metrics.enabled)
+    with col2:
+        if st.button("Reset Counters", use_container_width=True):
+            metrics.reset()
+        # Full pandas recomputation of the analytics rollups, replacing the incremental ones
+        if st.button("Rebuild Rollups", use_container_width=True):
+            if get_repository().rebuild_aggregates():
+                st.warning("Rollups had drifted from the data and were rebuilt.")
+            else:
+                st.success("Rollups rebuilt; they matched the data.")
+    
+    counters = metrics.counters()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Bytes Read", f"{counters.get('store.bytes_read', 0):,}")
+    with col2:
+        st.metric("Bytes Written", f"{counters.get('store.bytes_written', 0):,}")
+    with col3:
+        st.metric("Projects Loaded", len(get_repository()))
+    st.caption(f"Detail cache: {counters.get('repository.detail_hits', 0):,} hits, "
+               f"{counters.get('repository.detail_misses', 0):,} misses")
+    
+    st.markdown("### ⏱️ Latency (rolling window)")
+    timings = metrics.timings()
+    if timings:
+        st.dataframe(pd.DataFrame(timings).set_index('name').round(2), use_container_width=True)
+    elif metrics.enabled:
+        st.info("No timings yet. Use the app for a moment and come back.")
+    else:
+        st.info("Timings are off. Switch them on above or start the app with BID_TRACKER_DIAGNOSTICS=1.")
+    
+    st.markdown("### 🔁 This Session")
+    run_times = st.session_state.get('run_times', {})
+    st.dataframe(pd.DataFrame([{'scope': scope, 'runs': count, 'last_ms': round(run_times.get(scope, 0), 2)}
+                               for scope, count in st.session_state.get('run_counts', {}).items()]),
+                 use_container_width=True, hide_index=True)
+    
+    st.markdown("### 🔬 Profiler")
+    st.session_state.profile_runs = st.toggle("Profile every full run of this session with cProfile",
+                                              value=st.session_state.get('profile_runs', False))
+    last_profile = st.session_state.get('last_profile')
+    if last_profile:
+        st.caption(f"Last profile saved to {last_profile['path']}")
+        st.code(last_profile['summary'])
+
+# Run the app under cProfile and dump the stats to PROFILE_DIR; returns the path and top functions
+def profile_run(func):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        func()
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"run-{datetime.datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(25)
+        st.session_state.last_profile = {'path': path, 'summary': summary.getvalue()}
+
+def run_app():
+    if not st.session_state.authenticated:
+        restore_session()
+    sync_session_cookie()
     if not st.session_state.authenticated:
         login_page()
     else:
         main_dashboard()
 
+# Main app logic
+def main():
+    if st.session_state.get('profile_runs') and is_admin():
+        profile_run(run_app)
+    else:
+        run_app()
+    record_run_time('full run', RUN_STARTED)
+
 if __name__ == "__main__":
     main()
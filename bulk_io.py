@@ -0,0 +1,195 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+from itertools import islice
+
+from models import PROJECT_FIELDS, Project, validate_project
+from repository import ProjectRepository
+from storage import open_store
+
+# Streaming bulk import/export of projects (CSV, JSON Lines, Parquet), usable from the app or the command line
+
+FORMATS = ['csv', 'jsonl', 'parquet']
+CHUNK_SIZE = 5000
+
+
+class ImportValidationError(ValueError):
+    def __init__(self, row_number, errors):
+        super().__init__(f"Row {row_number}: {'; '.join(errors)}")
+        self.row_number = row_number
+        self.errors = errors
+
+
+# Guess the format from a file name (projects.csv, backup.jsonl, export.parquet)
+def detect_format(name):
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    if extension in ('json', 'ndjson'):
+        extension = 'jsonl'
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of '{name}'. Use one of: {', '.join(FORMATS)}")
+    return extension
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet import/export needs pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+# Yield raw row dicts one at a time; source is a path or a binary file object
+def read_rows(source, fmt):
+    if fmt == 'parquet':
+        pyarrow = _require_pyarrow()
+        for batch in pyarrow.parquet.ParquetFile(source).iter_batches(batch_size=CHUNK_SIZE):
+            yield from batch.to_pylist()
+        return
+    f = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+        if fmt == 'csv':
+            yield from csv.DictReader(text)
+        elif fmt == 'jsonl':
+            row_number = 0
+            for line in text:
+                if line.strip():
+                    row_number += 1
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        raise ImportValidationError(row_number, [f"not valid JSON ({e})"]) from None
+                    yield row
+        else:
+            raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    finally:
+        if f is not source:
+            f.close()
+
+
+# Validate rows and allocate IDs for rows without one, chunk by chunk
+def _prepare_chunks(repository, rows, chunk_size, skip_invalid, report):
+    rows = iter(rows)
+    row_number = 0
+    allocated = set()
+    now = datetime.datetime.now()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        valid = []
+        for row in chunk:
+            row_number += 1
+            errors = validate_project(row)
+            if errors:
+                if not skip_invalid:
+                    raise ImportValidationError(row_number, errors)
+                report['skipped'].append((row_number, errors))
+                continue
+            valid.append(row)
+        # One ID allocation per chunk rather than one lookup loop per row
+        new_ids = iter(repository.allocate_ids(sum(1 for row in valid if not row.get('id')), allocated))
+        prepared = []
+        for row in valid:
+            project = Project.from_dict(dict(row, id=row.get('id') or next(new_ids),
+                                             last_updated=row.get('last_updated') or now))
+            allocated.add(project.id)
+            prepared.append(project.to_dict())
+        report['imported'] += len(prepared)
+        yield prepared
+
+
+# Import rows into the repository in a single transaction. With skip_invalid=False the
+# first invalid row aborts the whole import; otherwise bad rows are listed in 'skipped'.
+def import_projects(repository, rows, chunk_size=CHUNK_SIZE, skip_invalid=False):
+    report = {'imported': 0, 'skipped': []}
+    repository.bulk_upsert(_prepare_chunks(repository, rows, chunk_size, skip_invalid, report))
+    return report
+
+
+# Normalise a stored row through Project so every export has the same types and date format
+def _export_row(row):
+    project = Project.from_dict(row)
+    row = {}
+    for field in PROJECT_FIELDS:
+        value = getattr(project, field)
+        row[field] = value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+    return row
+
+
+# Write every stored project to target (path or binary file object), one chunk at a time
+def export_projects(store, target, fmt, chunk_size=CHUNK_SIZE):
+    count = 0
+    chunks = ([_export_row(row) for row in chunk] for chunk in store.iter_chunks(chunk_size))
+    if fmt == 'parquet':
+        pyarrow = _require_pyarrow()
+        schema = pyarrow.schema([(field, pyarrow.float64() if field == 'value' else pyarrow.string())
+                                 for field in PROJECT_FIELDS])
+        with pyarrow.parquet.ParquetWriter(target, schema) as writer:
+            for chunk in chunks:
+                for row in chunk:
+                    row['value'] = float(row['value'])
+                writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+                count += len(chunk)
+        return count
+    f = open(target, 'wb') if isinstance(target, (str, os.PathLike)) else target
+    try:
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='', write_through=True)
+        if fmt == 'csv':
+            writer = csv.DictWriter(text, fieldnames=PROJECT_FIELDS)
+            writer.writeheader()
+        for chunk in chunks:
+            if fmt == 'csv':
+                writer.writerows(chunk)
+            elif fmt == 'jsonl':
+                text.writelines(json.dumps(row) + '\n' for row in chunk)
+            else:
+                raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+            count += len(chunk)
+        text.flush()
+        text.detach()
+    finally:
+        if f is not target:
+            f.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of bid tracker projects")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    import_parser = subcommands.add_parser('import', help="Import projects from a file")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--skip-invalid', action='store_true', help="Skip invalid rows instead of aborting")
+    export_parser = subcommands.add_parser('export', help="Export all projects to a file")
+    export_parser.add_argument('path')
+    for command in (import_parser, export_parser):
+        command.add_argument('--format', choices=FORMATS, help="File format (default: from the extension)")
+        command.add_argument('--storage', help="Storage engine (default: BID_TRACKER_STORAGE or sqlite)")
+        command.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    store = open_store(args.storage)
+    if args.command == 'import':
+        try:
+            report = import_projects(ProjectRepository(store), read_rows(args.path, fmt),
+                                     chunk_size=args.chunk_size, skip_invalid=args.skip_invalid)
+        except ImportValidationError as e:
+            print(f"Import aborted, nothing was saved. {e}", file=sys.stderr)
+            return 1
+        for row_number, errors in report['skipped']:
+            print(f"Skipped row {row_number}: {'; '.join(errors)}", file=sys.stderr)
+        print(f"Imported {report['imported']} projects ({len(report['skipped'])} skipped)")
+    else:
+        count = export_projects(store, args.path, fmt, chunk_size=args.chunk_size)
+        print(f"Exported {count} projects to {args.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Lightweight process-wide timings and counters for the Diagnostics page.
+# Everything is a no-op apart from one attribute check while metrics.enabled is False.
+
+WINDOW = 500
+
+
+# Rolling latency windows and running counters, shared by every session in the process
+class Metrics:
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._calls = {}
+        self._counters = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    # Decorator form of timer(); the enabled check happens per call so it can be toggled live
+    def timed(self, name):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    # One row per timed operation: total calls and p50/p95/max over the rolling window
+    def timings(self):
+        with self._lock:
+            windows = {name: sorted(samples) for name, samples in self._samples.items()}
+            calls = dict(self._calls)
+        rows = []
+        for name, samples in sorted(windows.items()):
+            rows.append({
+                'name': name,
+                'calls': calls[name],
+                'p50_ms': percentile(samples, 0.50) * 1000,
+                'p95_ms': percentile(samples, 0.95) * 1000,
+                'max_ms': samples[-1] * 1000,
+            })
+        return rows
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+            self._counters.clear()
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(int(round(fraction * (len(sorted_samples) - 1))), len(sorted_samples) - 1)]
+
+
+metrics = Metrics(enabled=os.environ.get('BID_TRACKER_DIAGNOSTICS', '0') == '1')
@@ -0,0 +1,166 @@
+import datetime
+import sys
+from datetime import date
+
+# Typed project record, its field lists, and the parsing and validation rules shared by
+# the forms, the stores and the service layer
+
+PROJECT_FIELDS = ['id', 'title', 'client', 'description', 'drive_link', 'status',
+                  'deadline', 'value', 'priority', 'created_date', 'last_updated']
+
+# Per-record version kept by the stores: 0 for a new record, bumped by every write
+RECORD_FIELDS = PROJECT_FIELDS + ['version']
+
+# Heavy free-text fields loaded on demand; everything else makes up the summary kept in memory
+DETAIL_FIELDS = ['description', 'drive_link']
+SUMMARY_FIELDS = [field for field in RECORD_FIELDS if field not in DETAIL_FIELDS]
+
+STATUSES = ["Draft", "Submitted", "Pending Response"]
+PRIORITIES = ["Low", "Medium", "High"]
+
+
+# Dates arrive as date objects from the forms and as ISO strings from storage
+def parse_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def parse_datetime(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.datetime.combine(value, datetime.time())
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def parse_value(value):
+    if value is None or value == '':
+        return 0
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+# Same rules as the add/edit forms: title and client required, known status and
+# priority, parseable dates and a non-negative whole-dollar value. Returns a list of problems.
+def validate_project(data):
+    if not isinstance(data, dict):
+        return [f"expected an object of project fields, got {type(data).__name__}"]
+    errors = []
+    for field in ['title', 'client']:
+        if not str(data.get(field) or '').strip():
+            errors.append(f"{field} is required")
+    if data.get('status') not in (None, '') and data['status'] not in STATUSES:
+        errors.append(f"status must be one of {', '.join(STATUSES)}")
+    if data.get('priority') not in (None, '') and data['priority'] not in PRIORITIES:
+        errors.append(f"priority must be one of {', '.join(PRIORITIES)}")
+    for field, parse in [('deadline', parse_date), ('created_date', parse_date), ('last_updated', parse_datetime)]:
+        try:
+            parse(data.get(field))
+        except (TypeError, ValueError):
+            errors.append(f"{field} is not a valid date: {data.get(field)!r}")
+    try:
+        value = parse_value(data.get('value'))
+        if value < 0:
+            errors.append("value must not be negative")
+        elif not isinstance(value, int):
+            errors.append(f"value must be a whole number of dollars: {data.get('value')!r}")
+    except (TypeError, ValueError):
+        errors.append(f"value is not a number: {data.get('value')!r}")
+    return errors
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# One project with its fields parsed once: dates are date/datetime objects, value is a
+# number, and status/priority strings are interned so every record shares one copy.
+# Records are shared between sessions, so they are read-only; use replace() to change one.
+# Subscript access (project['title']) is kept so pages read them like the old dicts.
+# A summary record has its DETAIL_FIELDS set to None, meaning "not loaded".
+class Project:
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, id, title, client, description='', drive_link='', status=STATUSES[0],
+                 deadline=None, value=0, priority=PRIORITIES[0], created_date=None, last_updated=None,
+                 version=0):
+        set_field = object.__setattr__
+        set_field(self, 'id', id)
+        set_field(self, 'title', title)
+        set_field(self, 'client', client)
+        set_field(self, 'description', description or '')
+        set_field(self, 'drive_link', drive_link or '')
+        set_field(self, 'status', _intern(status or STATUSES[0]))
+        set_field(self, 'deadline', parse_date(deadline))
+        set_field(self, 'value', parse_value(value))
+        set_field(self, 'priority', _intern(priority or PRIORITIES[0]))
+        set_field(self, 'created_date', parse_date(created_date))
+        set_field(self, 'last_updated', parse_datetime(last_updated))
+        set_field(self, 'version', int(version or 0))
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(**{field: data.get(field) for field in RECORD_FIELDS if field in data})
+
+    # Summary record from a row that may or may not carry the detail fields
+    @classmethod
+    def from_summary(cls, data):
+        project = cls.from_dict(data) if not isinstance(data, cls) else data.replace()
+        for field in DETAIL_FIELDS:
+            object.__setattr__(project, field, None)
+        return project
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in RECORD_FIELDS}
+
+    @property
+    def has_details(self):
+        return all(getattr(self, field) is not None for field in DETAIL_FIELDS)
+
+    # A changed copy; detail fields that were not loaded stay unloaded unless changed
+    def replace(self, **changes):
+        project = Project(**dict(self.to_dict(), **changes))
+        for field in DETAIL_FIELDS:
+            if getattr(self, field) is None and field not in changes:
+                object.__setattr__(project, field, None)
+        return project
+
+    def summary(self):
+        return Project.from_summary(self) if self.has_details else self
+
+    def days_remaining(self, today=None):
+        if self.deadline is None:
+            return None
+        return (self.deadline - (today or date.today())).days
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Project records are read-only; use replace()")
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __contains__(self, field):
+        return field in RECORD_FIELDS
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def __eq__(self, other):
+        return isinstance(other, Project) and self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Project(id={self.id!r}, title={self.title!r}, status={self.status!r}, version={self.version})"
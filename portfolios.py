@@ -0,0 +1,232 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+
+from models import STATUSES, Project
+from repository import ProjectRepository
+from storage import open_store_at, store_kind, store_version_at
+
+# Several portfolios (one store per business unit) mounted side by side, plus company-wide
+# rollups merged from each portfolio's own:
+#   BID_TRACKER_PORTFOLIOS="East=east/projects.db,West=west/projects.json"
+#   python portfolios.py --by status
+# Cold portfolios are loaded in worker processes that send back only their rollups, so the
+# company-wide numbers take about as long as the largest portfolio rather than the sum.
+# Worker processes are spawned, so scripts that build a PortfolioSet need the usual
+# `if __name__ == '__main__':` guard (or BID_TRACKER_PORTFOLIO_POOL=thread).
+
+PORTFOLIOS = os.environ.get('BID_TRACKER_PORTFOLIOS', '')
+POOL = os.environ.get('BID_TRACKER_PORTFOLIO_POOL', 'process')
+OUTLOOK_WINDOWS = (7, 30, 90)
+RECENT = 5
+
+
+# "East=east/projects.db,West=west/projects.json" -> {'East': 'east/projects.db', ...};
+# an entry without a name is named after its file
+def parse_portfolios(spec):
+    portfolios = {}
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, path = entry.rpartition('=')
+        name = name.strip() or os.path.splitext(os.path.basename(path))[0]
+        if name in portfolios:
+            raise ValueError(f"Portfolio '{name}' is listed twice in BID_TRACKER_PORTFOLIOS")
+        portfolios[name] = path.strip()
+    return portfolios
+
+
+# What the company-wide view needs from one portfolio: its full rollups, deadline outlook
+# and newest projects (as summary dicts, so it pickles cheaply out of a worker process)
+def _rollup(repository, windows, recent):
+    return {
+        'aggregates': repository.aggregates(),
+        'outlook': repository.deadline_outlook(windows),
+        'recent': [project.to_dict() for project in repository.recent(recent)],
+    }
+
+
+# Worker entry point: load one portfolio into a throwaway repository and keep only its rollup
+def load_rollup(path, windows=OUTLOOK_WINDOWS, recent=RECENT):
+    version = store_version_at(path)
+    return version, _rollup(ProjectRepository(open_store_at(path)), windows, recent)
+
+
+# Sum of ProjectAggregates snapshots: counts and values added up key by key
+def merge_aggregates(snapshots):
+    merged = {'count': 0, 'total_value': 0, 'counts': {}, 'values': {}}
+    for snapshot in snapshots:
+        merged['count'] += snapshot['count']
+        merged['total_value'] += snapshot['total_value']
+        for kind in ('counts', 'values'):
+            for group, buckets in snapshot[kind].items():
+                target = merged[kind].setdefault(group, {})
+                for key, amount in buckets.items():
+                    target[key] = target.get(key, 0) + amount
+    return merged
+
+
+def merge_outlooks(outlooks):
+    merged = {}
+    for outlook in outlooks:
+        for key, (count, value) in outlook.items():
+            total_count, total_value = merged.get(key, (0, 0))
+            merged[key] = (total_count + count, total_value + value)
+    return merged
+
+
+# Company-wide read-only view with the read methods the dashboard and analytics pages
+# use on a ProjectRepository (aggregates, deadline_outlook, recent, len)
+class CombinedView:
+    def __init__(self, rollups):
+        self.rollups = rollups
+        self._aggregates = merge_aggregates(rollup['aggregates'] for rollup in rollups.values())
+        self._outlook = merge_outlooks(rollup['outlook'] for rollup in rollups.values())
+
+    def __len__(self):
+        return self._aggregates['count']
+
+    def aggregates(self, groups=None):
+        if groups is None:
+            return self._aggregates
+        return dict(self._aggregates,
+                    counts={group: self._aggregates['counts'].get(group, {}) for group in groups},
+                    values={group: self._aggregates['values'].get(group, {}) for group in groups})
+
+    # Only the windows the portfolios were rolled up with are available
+    def deadline_outlook(self, windows=OUTLOOK_WINDOWS):
+        return {key: self._outlook.get(key, (0, 0)) for key in ['overdue', *windows, 'no_deadline']}
+
+    # Newest projects across every portfolio (each portfolio sent its own newest few)
+    def recent(self, k=RECENT):
+        projects = [Project.from_summary(row) for rollup in self.rollups.values() for row in rollup['recent']]
+        projects.sort(key=lambda project: project.created_date or date.min, reverse=True)
+        return projects[:k]
+
+    # One row per portfolio: project count, pipeline value, status counts and overdue projects
+    def breakdown(self):
+        rows = []
+        for name, rollup in self.rollups.items():
+            aggregates = rollup['aggregates']
+            row = {'portfolio': name, 'projects': aggregates['count'], 'value': aggregates['total_value']}
+            for status in STATUSES:
+                row[status] = aggregates['counts']['status'].get(status, 0)
+            row['overdue'] = rollup['outlook']['overdue'][0]
+            rows.append(row)
+        return rows
+
+
+# The mounted portfolios. Repositories are opened on first use (when someone works in a
+# portfolio) and then kept current like the single-store app's repository; the company-wide
+# view reads their rollups directly and loads every other portfolio in the worker pool,
+# caching each result until that portfolio's store changes (or the day rolls over).
+class PortfolioSet:
+    def __init__(self, paths, write_behind=False, pool=POOL, max_workers=None, windows=OUTLOOK_WINDOWS):
+        if not paths:
+            raise ValueError("No portfolios to mount")
+        for name, path in paths.items():
+            store_kind(path)
+            if not os.path.exists(path):
+                raise ValueError(f"Portfolio '{name}': there is no store at {path}")
+        self.paths = dict(paths)
+        self.write_behind = write_behind
+        self.windows = tuple(windows)
+        self._pool = pool
+        self._max_workers = max_workers or min(len(self.paths), os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._rollup_lock = threading.Lock()
+        self._executor = None
+        self._repositories = {}
+        self._rollups = {}
+
+    def names(self):
+        return list(self.paths)
+
+    # The portfolio's repository, opened (and loaded on first read) the first time it is asked for
+    def repository(self, name):
+        with self._lock:
+            repository = self._repositories.get(name)
+            if repository is None:
+                repository = self._repositories[name] = ProjectRepository(
+                    open_store_at(self.paths[name]), write_behind=self.write_behind)
+            return repository
+
+    def mounted(self):
+        with self._lock:
+            return dict(self._repositories)
+
+    # Separate worker processes only pay off with more than one CPU and more than one portfolio;
+    # otherwise threads still overlap the loads' file and database reads
+    def _get_executor(self):
+        if self._executor is None:
+            if self._pool == 'process' and self._max_workers > 1:
+                self._executor = ProcessPoolExecutor(self._max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(len(self.paths), thread_name_prefix='portfolio')
+        return self._executor
+
+    # {name: rollup} for every portfolio: mounted ones from their live repositories, the rest
+    # from the cache or, when their store has changed, from the worker pool (all in parallel)
+    # (sessions asking at the same time share one round of loads)
+    def rollups(self):
+        with self._rollup_lock:
+            today = date.today()
+            mounted = self.mounted()
+            pending = {}
+            for name, path in self.paths.items():
+                if name in mounted:
+                    continue
+                cached = self._rollups.get(name)
+                if cached is None or cached[0] != (store_version_at(path), today):
+                    pending[name] = self._get_executor().submit(load_rollup, path, self.windows, RECENT)
+            # Mounted repositories refresh (usually a no-op) while the workers load the rest
+            live = {name: _rollup(repository, self.windows, RECENT) for name, repository in mounted.items()}
+            for name, future in pending.items():
+                version, rollup = future.result()
+                self._rollups[name] = ((version, today), rollup)
+            return {name: live[name] if name in live else self._rollups[name][1] for name in self.paths}
+
+    def combined(self):
+        return CombinedView(self.rollups())
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        for repository in self.mounted().values():
+            repository.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Company-wide numbers across several bid tracker portfolios")
+    parser.add_argument('portfolios', nargs='*', help="name=path entries (default: BID_TRACKER_PORTFOLIOS)")
+    parser.add_argument('--by', default='status', help="Also total count and value by this rollup group")
+    parser.add_argument('--pool', choices=['process', 'thread'], default=POOL)
+    args = parser.parse_args(argv)
+
+    try:
+        portfolios = PortfolioSet(parse_portfolios(','.join(args.portfolios) or PORTFOLIOS), pool=args.pool)
+    except ValueError as e:
+        print(f"{e} (pass name=path entries or set BID_TRACKER_PORTFOLIOS)", file=sys.stderr)
+        return 1
+    try:
+        view = portfolios.combined()
+    finally:
+        portfolios.close()
+    for row in view.breakdown():
+        print(f"{row['portfolio']}\t{row['projects']}\t{row['value']}\toverdue {row['overdue']}")
+    print(f"Company-wide\t{len(view)}\t{view.aggregates()['total_value']}")
+    counts = view.aggregates([args.by])['counts'][args.by]
+    values = view.aggregates([args.by])['values'][args.by]
+    for key in sorted(counts, key=str):
+        print(f"  {key}\t{counts[key]}\t{values.get(key, 0)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
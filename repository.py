@@ -0,0 +1,652 @@
+import random
+import string
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import date, timedelta
+from itertools import islice
+
+from instrumentation import metrics
+from models import DETAIL_FIELDS, PRIORITIES, STATUSES, SUMMARY_FIELDS, Project, parse_value
+from search_index import SearchIndex
+from storage import FlushTicket, VersionConflict, WriteBehindWriter
+
+# In-memory project repository shared by every session: sorted indexes, running
+# aggregates, search and paging over one store, with optional write-behind saves
+
+FIRST_PROJECT_ID = "QB6TYKDHVWL9"
+ID_ALPHABET = string.ascii_uppercase + string.digits
+ID_LENGTH = 12
+
+SORT_FIELDS = ['created_date', 'deadline', 'value']
+DETAIL_CACHE_SIZE = 1024
+
+
+# Sort key for one field; projects without a date sort first
+def sort_key(project, field):
+    value = getattr(project, field)
+    if value is None:
+        return date.min
+    return value
+
+
+# Bounded least-recently-used map for project detail payloads
+class LRUCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Monday of the week / first of the month a date falls in (None stays None)
+def week_start(day):
+    return None if day is None else day - timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return None if day is None else day.replace(day=1)
+
+
+# Categories for a frame column: the known values in their usual order, then any other
+# values found in the data, so records with an unexpected value do not turn into NaN
+def _categories(known, values):
+    extra = set(values).difference(known, [None])
+    return list(known) + sorted(extra, key=str)
+
+
+# Running counts and value sums, overall and per group: status, priority, client, and
+# week/month buckets of created_date and deadline (plus per-day deadlines for the
+# upcoming-deadline windows). Each record change adjusts one dict entry per group, so
+# pages never rescan the portfolio; projects without a date are left out of its buckets.
+class ProjectAggregates:
+    GROUPS = {
+        'status': lambda p: p.status,
+        'priority': lambda p: p.priority,
+        'client': lambda p: p.client,
+        'created_week': lambda p: week_start(p.created_date),
+        'created_month': lambda p: month_start(p.created_date),
+        'deadline_week': lambda p: week_start(p.deadline),
+        'deadline_month': lambda p: month_start(p.deadline),
+        'deadline_day': lambda p: p.deadline,
+    }
+
+    def __init__(self):
+        self.count = 0
+        self.total_value = 0
+        self.counts = {group: {} for group in self.GROUPS}
+        self.values = {group: {} for group in self.GROUPS}
+
+    def add(self, project, sign=1):
+        value = project.value or 0
+        self.count += sign
+        self.total_value += sign * value
+        for group, key_of in self.GROUPS.items():
+            key = key_of(project)
+            if key is None:
+                continue
+            counts, values = self.counts[group], self.values[group]
+            counts[key] = counts.get(key, 0) + sign
+            values[key] = values.get(key, 0) + sign * value
+            if counts[key] == 0:
+                del counts[key]
+                del values[key]
+
+    def remove(self, project):
+        self.add(project, sign=-1)
+
+    # Full rebuild from the repository's pandas frame, one groupby per group
+    @classmethod
+    def from_frame(cls, frame):
+        import pandas as pd
+        aggregates = cls()
+        aggregates.count = len(frame)
+        aggregates.total_value = parse_value(frame['value'].sum())
+        created, deadline = frame['created_date'], frame['deadline']
+        # Group on plain values: a categorical key would only count its declared categories
+        keys = {
+            'status': frame['status'].astype(object),
+            'priority': frame['priority'].astype(object),
+            'client': frame['client'].astype(object),
+            'created_week': (created - pd.to_timedelta(created.dt.weekday, unit='D')).dt.date,
+            'created_month': created.dt.to_period('M').dt.start_time.dt.date,
+            'deadline_week': (deadline - pd.to_timedelta(deadline.dt.weekday, unit='D')).dt.date,
+            'deadline_month': deadline.dt.to_period('M').dt.start_time.dt.date,
+            'deadline_day': deadline.dt.date,
+        }
+        for group, key in keys.items():
+            grouped = frame['value'].groupby(key, observed=True).agg(['size', 'sum'])
+            aggregates.counts[group] = {k: int(n) for k, n in grouped['size'].items() if n}
+            aggregates.values[group] = {k: parse_value(v) for k, v in grouped['sum'].items()
+                                        if k in aggregates.counts[group]}
+        return aggregates
+
+    # Plain-dict copy for callers that render outside the repository lock (groups limits what is copied)
+    def snapshot(self, groups=None):
+        groups = self.GROUPS if groups is None else groups
+        return {
+            'count': self.count,
+            'total_value': self.total_value,
+            'counts': {group: dict(self.counts[group]) for group in groups},
+            'values': {group: dict(self.values[group]) for group in groups},
+        }
+
+    # Overdue, due within each window (today through today + days) and undated projects,
+    # as (count, value) pairs read off the per-day deadline buckets
+    def deadline_outlook(self, windows=(7, 30, 90), today=None):
+        today = today or date.today()
+        outlook = {'overdue': [0, 0], **{days: [0, 0] for days in windows}}
+        dated_count, dated_value = 0, 0
+        for day, count in self.counts['deadline_day'].items():
+            value = self.values['deadline_day'][day]
+            dated_count += count
+            dated_value += value
+            offset = (day - today).days
+            if offset < 0:
+                entry = outlook['overdue']
+                entry[0] += count
+                entry[1] += value
+            for days in windows:
+                if 0 <= offset <= days:
+                    entry = outlook[days]
+                    entry[0] += count
+                    entry[1] += value
+        outlook = {key: tuple(entry) for key, entry in outlook.items()}
+        outlook['no_deadline'] = (self.count - dated_count, self.total_value - dated_value)
+        return outlook
+
+
+# Process-wide repository: an id -> record index over the store, reloaded only when
+# the store version moves. Records are read-only Project objects parsed once at load,
+# so sessions share one copy; lookups, updates and deletes are O(1) dict operations.
+# The index holds summary records only; description and drive_link are fetched from
+# the store when a record is opened and kept in a bounded LRU, so memory and startup
+# time follow the summary size rather than the amount of description text.
+# With write_behind=True changes land in memory at once and a background
+# WriteBehindWriter persists them; otherwise each write goes straight to the store.
+class ProjectRepository:
+    def __init__(self, store, write_behind=False, detail_cache_size=DETAIL_CACHE_SIZE):
+        self.store = store
+        self._lock = threading.RLock()
+        self._writer = WriteBehindWriter(store, on_flush=self._after_write) if write_behind else None
+        self._version = None
+        self._by_id = {}
+        self._details = LRUCache(detail_cache_size)
+        # Details of writes still queued in the writer, which the store cannot serve yet
+        self._pinned = {}
+        self._view = None
+        self._labels = None
+        self._frame = None
+        self._sorted = {field: [] for field in SORT_FIELDS}
+        self._search = None
+        # Record version each project was indexed at, and the IDs written since the last
+        # search (None after a reload, when every version is compared)
+        self._search_versions = {}
+        self._search_dirty = None
+        self._search_lock = threading.Lock()
+        self._by_status = {}
+        self._aggregates = ProjectAggregates()
+
+    # Reload from the store if anyone else has written since we last looked
+    # (never while our own writes are still queued, or they would be lost from memory)
+    def refresh(self):
+        if self._writer is not None and self._writer.busy:
+            return self
+        if self._pinned:
+            with self._lock:
+                # Upserts pin under this lock before queueing, so an idle writer means all were flushed
+                if not self._writer.busy:
+                    self._pinned.clear()
+        version = self.store.version()
+        if version != self._version or self._version is None:
+            with self._lock:
+                # Upserts queue under this lock, so this catches any write queued since the first check
+                if self._writer is not None and self._writer.busy:
+                    return self
+                if version != self._version or self._version is None:
+                    with metrics.timer('repository.load'):
+                        self._load(self._parse(self.store.load_summaries()))
+                    self._version = version
+        return self
+
+    @staticmethod
+    def _parse(rows):
+        by_id = {}
+        for row in rows:
+            project = Project.from_summary(row)
+            by_id[project.id] = project
+        return by_id
+
+    def _load(self, by_id):
+        self._by_id = by_id
+        self._details.clear()
+        self._pinned.clear()
+        self._sorted = {field: sorted((sort_key(p, field), p.id) for p in by_id.values())
+                        for field in SORT_FIELDS}
+        # The search index is the most expensive structure, so it survives reloads and the
+        # next search re-indexes only the records whose version changed
+        self._search_dirty = None
+        self._by_status = {}
+        self._aggregates = ProjectAggregates()
+        for project in by_id.values():
+            self._aggregates.add(project)
+            self._by_status.setdefault(project.status, set()).add(project.id)
+        self._invalidate_views()
+
+    # Keep the sorted lists, search index, status sets and aggregates in step with a single
+    # record change; deleting a project that is already gone changes nothing
+    def _index(self, old, new):
+        if old is None and new is None:
+            return
+        for field, entries in self._sorted.items():
+            if old is not None:
+                i = bisect_left(entries, (sort_key(old, field), old.id))
+                if i < len(entries) and entries[i][1] == old.id:
+                    del entries[i]
+            if new is not None:
+                insort(entries, (sort_key(new, field), new.id))
+        if old is not None:
+            self._aggregates.remove(old)
+            self._by_status.get(old.status, set()).discard(old.id)
+        if new is not None:
+            self._aggregates.add(new)
+            self._by_status.setdefault(new.status, set()).add(new.id)
+        if self._search_dirty is not None:
+            self._search_dirty.add((new or old).id)
+
+    def _invalidate_views(self):
+        self._view = None
+        self._labels = None
+        self._frame = None
+
+    # Tuple of all records in insertion order, rebuilt at most once per change
+    def all(self):
+        self.refresh()
+        view = self._view
+        if view is None:
+            with self._lock:
+                view = self._view = tuple(self._by_id.values())
+        return view
+
+    # "ID - Title" strings for select boxes, rebuilt at most once per change
+    def labels(self):
+        self.refresh()
+        labels = self._labels
+        if labels is None:
+            with self._lock:
+                labels = self._labels = tuple(f"{p.id} - {p.title}" for p in self._by_id.values())
+        return labels
+
+    # Columnar pandas view of the portfolio, built at most once per change: datetime64
+    # dates and categorical status/priority, for whole-portfolio recomputation.
+    # pandas is imported here so the rest of the repository stays importable without it.
+    def frame(self):
+        self.refresh()
+        frame = self._frame
+        if frame is None:
+            import pandas as pd
+            with self._lock:
+                records = list(self._by_id.values())
+            columns = {field: [getattr(p, field) for p in records] for field in SUMMARY_FIELDS}
+            frame = pd.DataFrame({
+                'id': pd.Series(columns['id'], dtype='string'),
+                'title': pd.Series(columns['title'], dtype='string'),
+                'client': pd.Series(columns['client'], dtype='category'),
+                'status': pd.Categorical(columns['status'], categories=_categories(STATUSES, columns['status'])),
+                'priority': pd.Categorical(columns['priority'], categories=_categories(PRIORITIES, columns['priority'])),
+                'value': pd.Series(columns['value'], dtype='float64'),
+                'deadline': pd.to_datetime(pd.Series(columns['deadline'], dtype='object')),
+                'created_date': pd.to_datetime(pd.Series(columns['created_date'], dtype='object')),
+                'last_updated': pd.to_datetime(pd.Series(columns['last_updated'], dtype='object')),
+            })
+            self._frame = frame
+        return frame
+
+    # Full record (summary plus details), or None if there is no such project
+    def get(self, project_id):
+        self.refresh()
+        project = self._by_id.get(project_id)
+        if project is None:
+            return None
+        details = self._load_details([project_id]).get(project_id, dict.fromkeys(DETAIL_FIELDS, ''))
+        return project.replace(**details)
+
+    # Summary record (no description or drive_link), or None if there is no such project
+    def get_summary(self, project_id):
+        self.refresh()
+        return self._by_id.get(project_id)
+
+    # Full records for a handful of summaries (e.g. one dashboard page), fetched in one store call
+    def expand(self, projects):
+        details = self._load_details([p.id for p in projects if not p.has_details])
+        return [p.replace(**details[p.id]) if p.id in details else p for p in projects]
+
+    # Details from queued writes, then the LRU, then one batched store read for the rest
+    def _load_details(self, project_ids):
+        found = {}
+        missing = []
+        with self._lock:
+            for project_id in project_ids:
+                details = self._pinned.get(project_id) or self._details.get(project_id)
+                if details is None:
+                    missing.append(project_id)
+                else:
+                    found[project_id] = details
+        if metrics.enabled:
+            metrics.add('repository.detail_hits', len(found))
+            metrics.add('repository.detail_misses', len(missing))
+        if missing:
+            fetched = self.store.load_details(missing)
+            with self._lock:
+                for project_id, details in fetched.items():
+                    details = {field: details.get(field) or '' for field in DETAIL_FIELDS}
+                    self._details.put(project_id, details)
+                    found[project_id] = details
+        return found
+
+    def _remember_details(self, project):
+        details = {field: getattr(project, field) for field in DETAIL_FIELDS}
+        self._details.put(project.id, details)
+        if self._writer is not None:
+            self._pinned[project.id] = details
+
+    # Bring the search index in step with the records. Only the search lock is held while
+    # indexing, so a first build or a big catch-up never holds up sessions that are not searching.
+    # Records written since the last search (or, after a reload, whose version changed) are
+    # re-tokenized; the first search, or a catch-up covering most of the portfolio, rebuilds.
+    def _sync_search(self):
+        with self._lock:
+            dirty = self._search_dirty
+            if self._search is None or dirty is None:
+                # A C-level copy, so the version comparison below can run without the lock
+                records = dict(self._by_id)
+            else:
+                records = {project_id: self._by_id.get(project_id) for project_id in dirty}
+            self._search_dirty = set()
+        versions = self._search_versions
+        if self._search is None:
+            stale = records
+        elif dirty is None:
+            stale = {project_id: project for project_id, project in records.items()
+                     if versions.get(project_id) != project.version}
+            stale.update(dict.fromkeys(versions.keys() - records.keys()))
+        else:
+            stale = {project_id: project for project_id, project in records.items()
+                     if versions.get(project_id) != (project.version if project else None)}
+        if self._search is None or dirty is None and len(stale) > len(records) // 2:
+            stale = records
+            index, versions = SearchIndex(), {}
+        else:
+            index = self._search
+        current = {project_id: project for project_id, project in stale.items() if project is not None}
+        for project_id in stale.keys() - current.keys():
+            index.remove(project_id)
+            versions.pop(project_id, None)
+        for document in self._search_documents(current, stream=index is not self._search):
+            index.update(document)
+            versions[document['id']] = current[document['id']].version
+        self._search, self._search_versions = index, versions
+
+    # Search documents for summaries: id/title/client from memory, descriptions from queued
+    # writes or the store (streamed in chunks for a rebuild); only tokens are kept, never the text
+    def _search_documents(self, projects, stream):
+        pending = dict(projects)
+
+        def documents(rows):
+            for row in rows:
+                project = pending.pop(row['id'], None)
+                if project is not None:
+                    details = self._pinned.get(project.id) or row
+                    yield {'id': project.id, 'title': project.title, 'client': project.client,
+                           'description': details.get('description')}
+
+        if stream:
+            for chunk in self.store.iter_chunks():
+                yield from documents(chunk)
+        elif pending:
+            yield from documents(dict(details, id=project_id)
+                                 for project_id, details in self.store.load_details(list(pending)).items())
+        # Records the store does not have yet (writes still queued)
+        for project in pending.values():
+            yield {'id': project.id, 'title': project.title, 'client': project.client,
+                   'description': self._pinned.get(project.id, {}).get('description')}
+
+    # Change events for one project, newest first (None if the store keeps no change log).
+    # Queued writes show up once the background writer has flushed them.
+    def history(self, project_id):
+        return self.store.history(project_id)
+
+    def __contains__(self, project_id):
+        return self.get(project_id) is not None
+
+    def __len__(self):
+        self.refresh()
+        return len(self._by_id)
+
+    # IDs matching a search query and/or status, or None when neither filter applies
+    @metrics.timed('repository.match')
+    def match(self, query=None, status=None):
+        self.refresh()
+        ids = None
+        if query:
+            with self._search_lock:
+                self._sync_search()
+                ids = self._search.search(query)
+        with self._lock:
+            if status is not None:
+                status_ids = self._by_status.get(status, set())
+                ids = set(status_ids) if ids is None else ids & status_ids
+            return ids
+
+    # Counts and value sums per group (see ProjectAggregates.snapshot); pass groups to copy only those
+    def aggregates(self, groups=None):
+        self.refresh()
+        with self._lock:
+            return self._aggregates.snapshot(groups)
+
+    def deadline_outlook(self, windows=(7, 30, 90)):
+        self.refresh()
+        with self._lock:
+            return self._aggregates.deadline_outlook(windows)
+
+    # Recompute every rollup from scratch with pandas (after a suspected drift, or to check
+    # the incremental path); returns whether the rebuilt rollups differ from the running ones
+    def rebuild_aggregates(self):
+        with self._lock:
+            rebuilt = ProjectAggregates.from_frame(self.frame())
+            drifted = rebuilt.snapshot() != self._aggregates.snapshot()
+            self._aggregates = rebuilt
+        return drifted
+
+    # The k most recently created projects, read off the end of the created_date index
+    def recent(self, k=5):
+        return self.page('created_date', descending=True, limit=k)[1]
+
+    # One page of records ordered by a sort field, plus the total number of matches.
+    # ids restricts the result to a set of matching IDs (None means every project).
+    @metrics.timed('repository.page')
+    def page(self, sort_field, descending=False, offset=0, limit=25, ids=None):
+        self.refresh()
+        with self._lock:
+            entries = self._sorted[sort_field]
+            if ids is None:
+                total = len(entries)
+                if descending:
+                    start = max(total - offset - limit, 0)
+                    chosen = entries[start:max(total - offset, 0)][::-1]
+                else:
+                    chosen = entries[offset:offset + limit]
+                page_ids = [project_id for _, project_id in chosen]
+            elif len(ids) * len(ids) * 16 < (offset + limit) * len(entries):
+                # So few matches that sorting them beats walking the index until the page fills up
+                matched = sorted((sort_key(self._by_id[i], sort_field), i) for i in ids if i in self._by_id)
+                total = len(matched)
+                if descending:
+                    matched.reverse()
+                page_ids = [project_id for _, project_id in matched[offset:offset + limit]]
+            else:
+                # Walk the presorted index from the nearer end and stop once the page is full,
+                # so the cost follows the page position rather than the number of matches
+                total = len(ids)
+                count = max(min(limit, total - offset), 0)
+                after = total - offset - count
+                if count == 0:
+                    page_ids = []
+                elif offset <= after:
+                    ordered = reversed(entries) if descending else entries
+                    page_ids = list(islice((i for _, i in ordered if i in ids), offset, offset + count))
+                else:
+                    ordered = entries if descending else reversed(entries)
+                    page_ids = list(islice((i for _, i in ordered if i in ids), after, after + count))[::-1]
+            return total, [self._by_id[project_id] for project_id in page_ids]
+
+    # First project gets the fixed ID, later ones a random ID not already in the index
+    def new_id(self):
+        self.refresh()
+        if not self._by_id:
+            return FIRST_PROJECT_ID
+        while True:
+            project_id = ''.join(random.choices(ID_ALPHABET, k=ID_LENGTH))
+            if project_id not in self._by_id:
+                return project_id
+
+    # n fresh IDs that collide neither with loaded projects nor with each other (or reserved).
+    # Unlike new_id() this does not refresh: bulk_upsert() loads before its transaction opens
+    # and calls this from inside it, where taking the repository lock would invert the lock
+    # order against a reader that holds it while waiting on the store.
+    def allocate_ids(self, n, reserved=()):
+        ids = []
+        taken = set(reserved)
+        if not self._by_id and FIRST_PROJECT_ID not in taken and n:
+            ids.append(FIRST_PROJECT_ID)
+            taken.add(FIRST_PROJECT_ID)
+        while len(ids) < n:
+            project_id = ''.join(random.choices(ID_ALPHABET, k=ID_LENGTH))
+            if project_id not in self._by_id and project_id not in taken:
+                ids.append(project_id)
+                taken.add(project_id)
+        return ids
+
+    # Upsert an iterable of chunks (lists of dicts) in one store transaction. Only one chunk
+    # is in flight at a time; the in-memory indexes are rebuilt from the store on next read.
+    # The chunks may call allocate_ids() while the transaction is open, so load first.
+    # The repository lock is only taken once the store is done, but the store holds its own
+    # lock for the whole import, so reads that go to the store (a reload, or opening a
+    # record whose details are not cached) block until the transaction commits.
+    def bulk_upsert(self, chunks):
+        self.flush()
+        self.refresh()
+        versions = self.store.bulk_upsert(chunks)
+        with self._lock:
+            self._version = None
+            self._invalidate_views()
+        return versions
+
+    # Upserts (dicts) and deletes in one store transaction, each write whose ID is in
+    # expected_versions checked against the stored record inside it. Returns
+    # {project_id: VersionConflict} for the writes that were left out; the in-memory
+    # indexes are rebuilt from the store on next read.
+    def apply_batch(self, upserts, deletes=(), expected_versions=None):
+        self.flush()
+        versions, conflicts = self.store.apply_batch(list(upserts), list(deletes), expected_versions)
+        with self._lock:
+            self._version = None
+            self._invalidate_views()
+        return conflicts
+
+    # Our own write reached the store: keep the in-memory state unless another writer got in
+    # first or the store turned down one of our writes (conflicts), in which case the next
+    # refresh reloads. Runs on the writer thread without the repository lock; refresh()
+    # stays out of the way while it is busy.
+    def _after_write(self, versions, conflicts=None):
+        before, after = versions
+        self._version = after if before == self._version and not conflicts else None
+
+    # Last background write failure, or None while saves are succeeding
+    def write_error(self):
+        return self._writer.last_error if self._writer is not None else None
+
+    # Block until queued writes are on disk (no-op for write-through repositories)
+    def flush(self, timeout=None):
+        return self._writer.flush(timeout) if self._writer is not None else True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    # Write-through stores finish before the in-memory change; either way callers get a ticket
+    def _write_through(self, write):
+        ticket = FlushTicket()
+        try:
+            versions = write()
+        except VersionConflict:
+            # Someone else changed the record on disk: reload on next read
+            self._version = None
+            raise
+        self._after_write(versions)
+        ticket._resolve(versions)
+        return ticket
+
+    # In-memory version of a record (0 if there is none); raises VersionConflict if it is not expected_version
+    def _check_version(self, project_id, expected_version):
+        current = self._by_id.get(project_id)
+        actual = current.version if current is not None else 0
+        if expected_version is not None and expected_version != actual:
+            raise VersionConflict(project_id, expected_version, actual)
+        return actual
+
+    # Summary records passed back in are completed from the stored details, so a
+    # replace() on a listed record never blanks its description.
+    # With expected_version the write only happens if the record is still at that version:
+    # checked in memory at once, and write-behind repositories check the stored version again
+    # when the write is flushed, putting any VersionConflict found then on the returned ticket.
+    def upsert(self, project, expected_version=None):
+        project = Project.from_dict(project)
+        if not project.has_details:
+            project = self.expand([project])[0]
+            if not project.has_details:
+                project = project.replace(**{field: getattr(project, field) or '' for field in DETAIL_FIELDS})
+        with self._lock:
+            project = project.replace(version=self._check_version(project.id, expected_version) + 1)
+            if self._writer is not None:
+                self._remember_details(project)
+                ticket = self._writer.submit_upsert(project.to_dict(), expected_version)
+            else:
+                ticket = self._write_through(lambda: self.store.upsert(project.to_dict(), expected_version))
+                self._remember_details(project)
+            self._index(self._by_id.get(project.id), project)
+            self._by_id[project.id] = project.summary()
+            self._invalidate_views()
+        return ticket
+
+    def delete(self, project_id, expected_version=None):
+        with self._lock:
+            self._check_version(project_id, expected_version)
+            if self._writer is not None:
+                ticket = self._writer.submit_delete(project_id, expected_version)
+            else:
+                ticket = self._write_through(lambda: self.store.delete(project_id, expected_version))
+            self._index(self._by_id.pop(project_id, None), None)
+            self._details.pop(project_id)
+            self._pinned.pop(project_id, None)
+            self._invalidate_views()
+        return ticket
@@ -0,0 +1,102 @@
+import re
+
+# Incremental full-text index for the dashboard search box
+
+SEARCH_FIELDS = ['id', 'title', 'client', 'description']
+GRAM_SIZE = 3
+# Shorter query terms (single characters) are skipped: nearly every project contains them
+MIN_TERM_LENGTH = 2
+TERM_CACHE_SIZE = 256
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+# MIN_TERM_LENGTH..GRAM_SIZE character n-grams of a token, used to find vocabulary words containing a query term
+def _grams(token):
+    return {token[i:i + n] for n in range(MIN_TERM_LENGTH, GRAM_SIZE + 1) for i in range(len(token) - n + 1)}
+
+
+# Token index with substring matching: postings map each word to project IDs, and an
+# n-gram index over the (much smaller) vocabulary finds the words that contain a query
+# term, so prefix and mid-word matches never scan the projects themselves.
+# Every query term must match (AND), e.g. "acme roof" finds projects mentioning both.
+class SearchIndex:
+    def __init__(self):
+        self._postings = {}
+        self._vocab_grams = {}
+        self._tokens_by_id = {}
+        # Per-term and per-query results for repeated queries (reruns re-issue the same
+        # search); any write clears it
+        self._term_cache = {}
+
+    def add(self, project):
+        text = ' '.join(str(project.get(field) or '') for field in SEARCH_FIELDS)
+        tokens = set(tokenize(text))
+        self._term_cache.clear()
+        self._tokens_by_id[project['id']] = tokens
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                for gram in _grams(token):
+                    self._vocab_grams.setdefault(gram, set()).add(token)
+            ids.add(project['id'])
+
+    def remove(self, project_id):
+        self._term_cache.clear()
+        for token in self._tokens_by_id.pop(project_id, ()):
+            ids = self._postings[token]
+            ids.discard(project_id)
+            if not ids:
+                del self._postings[token]
+                for gram in _grams(token):
+                    words = self._vocab_grams[gram]
+                    words.discard(token)
+                    if not words:
+                        del self._vocab_grams[gram]
+
+    def update(self, project):
+        self.remove(project['id'])
+        self.add(project)
+
+    # Vocabulary words containing term: intersect the n-gram sets, then confirm the substring
+    def _words_containing(self, term):
+        if len(term) <= GRAM_SIZE:
+            return self._vocab_grams.get(term, ())
+        gram_sets = sorted((self._vocab_grams.get(term[i:i + GRAM_SIZE], set())
+                            for i in range(len(term) - GRAM_SIZE + 1)), key=len)
+        candidates = gram_sets[0].intersection(*gram_sets[1:])
+        return [word for word in candidates if term in word]
+
+    # Frozen set of project IDs matching every term in the query (None if the query has no terms)
+    def search(self, query):
+        terms = tuple(sorted({term for term in tokenize(query) if len(term) >= MIN_TERM_LENGTH},
+                             key=lambda term: (-len(term), term)))
+        if len(terms) < 2:
+            return self._search_terms(terms)
+        result = self._term_cache.get(terms)
+        if result is None:
+            result = self._search_terms(terms)
+            self._cache(terms, result)
+        return result
+
+    def _cache(self, key, ids):
+        if len(self._term_cache) >= TERM_CACHE_SIZE:
+            self._term_cache.clear()
+        self._term_cache[key] = ids
+
+    def _search_terms(self, terms):
+        result = None
+        for term in terms:
+            ids = self._term_cache.get(term)
+            if ids is None:
+                ids = frozenset().union(*(self._postings[word] for word in self._words_containing(term)))
+                self._cache(term, ids)
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
@@ -0,0 +1,281 @@
+import argparse
+import datetime
+import json
+import sys
+from datetime import date, timedelta
+
+from models import PRIORITIES, STATUSES, SUMMARY_FIELDS, Project, parse_date, parse_value, validate_project
+from repository import SORT_FIELDS, ProjectRepository
+from storage import VersionConflict, open_store
+
+# Project operations shared by the app, batch jobs and the command line. Importing this
+# pulls in neither Streamlit nor pandas, so nightly jobs start in a fraction of a second;
+# keep it that way for everything it imports (models, repository, storage and theirs),
+# which leaves pandas to be imported inside the few functions that need it:
+#   python service.py query --status Draft --sort deadline --limit 20
+#   python service.py bulk-status Submitted --status Draft --client "Acme County"
+#   python service.py sweep --days 7
+#   python service.py report --by client
+
+REPORT_GROUPS = ['status', 'priority', 'client', 'created_month', 'deadline_month']
+
+
+class ProjectValidationError(ValueError):
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class ProjectNotFound(KeyError):
+    def __init__(self, project_id):
+        super().__init__(project_id)
+        self.project_id = project_id
+
+    def __str__(self):
+        return f"No project {self.project_id}"
+
+
+# Predicates for query() filters, keyed by filter name; each gets a summary record and the filter value
+FILTERS = {
+    'priority': lambda project, value: project.priority == value,
+    'client': lambda project, value: project.client == value,
+    'deadline_before': lambda project, value: project.deadline is not None and project.deadline < parse_date(value),
+    'deadline_after': lambda project, value: project.deadline is not None and project.deadline > parse_date(value),
+    'min_value': lambda project, value: project.value >= parse_value(value),
+    'max_value': lambda project, value: project.value <= parse_value(value),
+}
+
+
+# Validation, ID allocation, timestamps, status changes and batch updates on top of a
+# ProjectRepository. Every write goes through the repository, so its caches, indexes and
+# rollups stay current, and single-record edits keep their version checks.
+class ProjectService:
+    def __init__(self, repository):
+        self.repository = repository
+
+    # A service on the configured store; batch jobs write through so their changes are on disk on return
+    @classmethod
+    def open(cls, storage=None, write_behind=False):
+        return cls(ProjectRepository(open_store(storage), write_behind=write_behind))
+
+    def get(self, project_id):
+        project = self.repository.get(project_id)
+        if project is None:
+            raise ProjectNotFound(project_id)
+        return project
+
+    # With wait=True a write-behind save is waited for, so a VersionConflict the store finds when
+    # the write is flushed is raised here too (other write errors stay queued and are retried)
+    @staticmethod
+    def _settle(ticket, wait):
+        if wait:
+            try:
+                ticket.wait()
+            except VersionConflict:
+                raise
+            except Exception:
+                pass
+
+    # New project from form or job input; a missing ID is allocated, missing dates default to today
+    def create_project(self, data, wait=False):
+        errors = validate_project(data)
+        if errors:
+            raise ProjectValidationError(errors)
+        now = datetime.datetime.now()
+        project = Project.from_dict(dict(
+            data,
+            id=data.get('id') or self.repository.new_id(),
+            description=data.get('description') or '',
+            drive_link=data.get('drive_link') or '',
+            created_date=data.get('created_date') or now.date(),
+            last_updated=now,
+            version=0,
+        ))
+        self._settle(self.repository.upsert(project, expected_version=0), wait)
+        return self.repository.get(project.id)
+
+    # Apply changes (a dict of fields) to a stored project; expected_version as for ProjectRepository.upsert
+    def update_project(self, project_id, changes, expected_version=None, wait=False):
+        project = self.get(project_id)
+        changes = {field: value for field, value in changes.items() if field not in ('id', 'version')}
+        errors = validate_project(dict(project.to_dict(), **changes))
+        if errors:
+            raise ProjectValidationError(errors)
+        updated = project.replace(**changes, last_updated=datetime.datetime.now())
+        self._settle(self.repository.upsert(updated, expected_version=expected_version), wait)
+        return self.repository.get(project_id)
+
+    def set_status(self, project_id, status, expected_version=None, wait=False):
+        return self.update_project(project_id, {'status': status}, expected_version, wait)
+
+    def delete_project(self, project_id, expected_version=None, wait=False):
+        self.get(project_id)
+        self._settle(self.repository.delete(project_id, expected_version=expected_version), wait)
+
+    # IDs of the projects matching filters: 'search' (words in title/client/description),
+    # 'status', and any of FILTERS. None means no filter applies (every project).
+    def match(self, filters=None):
+        filters = dict(filters or {})
+        unknown = set(filters) - set(FILTERS) - {'search', 'status'}
+        if unknown:
+            raise ValueError(f"Unknown filter(s) {', '.join(sorted(unknown))}. "
+                             f"Use search, status or {', '.join(FILTERS)}")
+        if filters.get('status') not in (None, *STATUSES):
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        if filters.get('priority') not in (None, *PRIORITIES):
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+        ids = self.repository.match(filters.pop('search', None) or None, filters.pop('status', None))
+        checks = [(FILTERS[name], value) for name, value in filters.items() if value is not None]
+        if not checks:
+            return ids
+        projects = self.repository.all() if ids is None else map(self.repository.get_summary, ids)
+        return {p.id for p in projects if p is not None and all(check(p, value) for check, value in checks)}
+
+    # Summary records matching filters, limited to the given IDs if there are any
+    def select(self, filters=None, ids=None):
+        matched = self.match(filters)
+        if ids is None and matched is None:
+            return list(self.repository.all())
+        projects = map(self.repository.get_summary, matched if ids is None else ids)
+        return [p for p in projects if p is not None and (matched is None or p.id in matched)]
+
+    # (total, records) for the projects matching filters, ordered by sort (one of SORT_FIELDS).
+    # Records are summaries; pass them to repository.expand() for descriptions and links.
+    def query(self, filters=None, sort='deadline', descending=False, limit=None, offset=0):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{sort}'. Use one of: {', '.join(SORT_FIELDS)}")
+        ids = self.match(filters)
+        if limit is None:
+            limit = len(self.repository)
+        return self.repository.page(sort, descending=descending, offset=offset, limit=limit, ids=ids)
+
+    # Move the matching projects (see select()) to status in one store transaction.
+    # Projects already at that status are left alone. Each write only goes ahead if the
+    # project is still at the version it was selected at, so edits saved elsewhere in the
+    # meantime are never overwritten. Returns (the summaries of the projects moved, as they
+    # were before, and the VersionConflicts of those skipped); dry_run=True saves nothing.
+    def bulk_update_status(self, status, filters=None, ids=None, dry_run=False):
+        if status not in STATUSES:
+            raise ProjectValidationError([f"status must be one of {', '.join(STATUSES)}"])
+        changing = [p for p in self.select(filters, ids) if p.status != status]
+        if dry_run or not changing:
+            return changing, []
+        now = datetime.datetime.now()
+        rows = [p.replace(status=status, last_updated=now).to_dict() for p in self.repository.expand(changing)]
+        conflicts = self.repository.apply_batch(rows, expected_versions={p.id: p.version for p in changing})
+        return [p for p in changing if p.id not in conflicts], list(conflicts.values())
+
+    # Projects that are overdue or due within `days` (today included), soonest first;
+    # filters narrow the sweep, e.g. {'status': 'Draft'} for bids not yet submitted
+    def deadline_sweep(self, days=7, filters=None, today=None):
+        today = today or date.today()
+        filters = dict(filters or {}, deadline_before=today + timedelta(days=days + 1))
+        total, projects = self.query(filters, sort='deadline')
+        return {
+            'overdue': [p for p in projects if p.deadline < today],
+            'due': [p for p in projects if p.deadline >= today],
+        }
+
+    # {group key: (count, total value)} for one of REPORT_GROUPS
+    def value_report(self, group='status'):
+        if group not in REPORT_GROUPS:
+            raise ValueError(f"Cannot report by '{group}'. Use one of: {', '.join(REPORT_GROUPS)}")
+        aggregates = self.repository.aggregates([group])
+        return {key: (count, aggregates['values'][group].get(key, 0))
+                for key, count in aggregates['counts'][group].items()}
+
+    def close(self):
+        self.repository.close()
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, (date, datetime.datetime)) else str(value)
+
+
+def _print_projects(projects, as_json):
+    for project in projects:
+        if as_json:
+            print(json.dumps({field: project[field] for field in SUMMARY_FIELDS}, default=_json_default))
+        else:
+            print('\t'.join(str(value) for value in (project.id, project.status, project.deadline or '',
+                                                     project.value, project.client, project.title)))
+
+
+def _filters(args):
+    return {
+        'search': args.search,
+        'status': args.status,
+        'priority': args.priority,
+        'client': args.client,
+        'deadline_before': args.deadline_before,
+        'deadline_after': args.deadline_after,
+        'min_value': args.min_value,
+        'max_value': args.max_value,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and update bid tracker projects without the app")
+    parser.add_argument('--storage', help="Storage engine (default: BID_TRACKER_STORAGE or sqlite)")
+    parser.add_argument('--json', action='store_true', help="Print JSON lines instead of tab-separated text")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    query_parser = subcommands.add_parser('query', help="List matching projects")
+    query_parser.add_argument('--sort', choices=SORT_FIELDS, default='deadline')
+    query_parser.add_argument('--desc', action='store_true', help="Sort in descending order")
+    query_parser.add_argument('--limit', type=int)
+    status_parser = subcommands.add_parser('bulk-status', help="Set the status of every matching project")
+    status_parser.add_argument('new_status', choices=STATUSES)
+    status_parser.add_argument('--ids', nargs='+', help="Only these projects")
+    status_parser.add_argument('--dry-run', action='store_true', help="List what would change without saving")
+    for command in (query_parser, status_parser):
+        command.add_argument('--search')
+        command.add_argument('--status', choices=STATUSES)
+        command.add_argument('--priority', choices=PRIORITIES)
+        command.add_argument('--client')
+        command.add_argument('--deadline-before', type=date.fromisoformat, metavar='YYYY-MM-DD')
+        command.add_argument('--deadline-after', type=date.fromisoformat, metavar='YYYY-MM-DD')
+        command.add_argument('--min-value', type=float)
+        command.add_argument('--max-value', type=float)
+    sweep_parser = subcommands.add_parser('sweep', help="Open projects that are overdue or due soon")
+    sweep_parser.add_argument('--days', type=int, default=7)
+    sweep_parser.add_argument('--status', choices=STATUSES, help="Only projects with this status")
+    report_parser = subcommands.add_parser('report', help="Project count and value per group")
+    report_parser.add_argument('--by', choices=REPORT_GROUPS, default='status')
+    args = parser.parse_args(argv)
+
+    service = ProjectService.open(args.storage)
+    try:
+        if args.command == 'query':
+            total, projects = service.query(_filters(args), sort=args.sort, descending=args.desc, limit=args.limit)
+            _print_projects(projects, args.json)
+            print(f"{len(projects)} of {total} projects", file=sys.stderr)
+        elif args.command == 'bulk-status':
+            changed, conflicts = service.bulk_update_status(args.new_status, _filters(args), ids=args.ids,
+                                                            dry_run=args.dry_run)
+            _print_projects(changed, args.json)
+            for conflict in conflicts:
+                print(f"Skipped: {conflict}", file=sys.stderr)
+            print(f"{'Would move' if args.dry_run else 'Moved'} {len(changed)} projects to {args.new_status}",
+                  file=sys.stderr)
+        elif args.command == 'sweep':
+            sweep = service.deadline_sweep(args.days, {'status': args.status})
+            for label, projects in sweep.items():
+                if not args.json:
+                    print(f"# {label} ({len(projects)})")
+                _print_projects(projects, args.json)
+        else:
+            for key, (count, value) in sorted(service.value_report(args.by).items(), key=lambda item: str(item[0])):
+                if args.json:
+                    print(json.dumps({'group': key, 'count': count, 'value': value}, default=_json_default))
+                else:
+                    print(f"{key}\t{count}\t{value}")
+    except (ValueError, KeyError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
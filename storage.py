@@ -0,0 +1,1241 @@
+import array
+import atexit
+import datetime
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from itertools import accumulate
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, so only one process may write a file-based store
+    fcntl = None
+
+from instrumentation import metrics
+from models import DETAIL_FIELDS, PROJECT_FIELDS, RECORD_FIELDS, SUMMARY_FIELDS, parse_date, parse_datetime, parse_value
+
+# Storage engines for the bid tracker (JSON, SQLite, append-only log and binary snapshot),
+# the cross-process store lock and the write-behind writer that batches saves
+
+JSON_PATH = os.environ.get('BID_TRACKER_JSON', 'projects.json')
+SQLITE_PATH = os.environ.get('BID_TRACKER_DB', 'projects.db')
+LOG_PATH = os.environ.get('BID_TRACKER_LOG', 'projects.log')
+SNAPSHOT_PATH = os.environ.get('BID_TRACKER_SNAPSHOT', 'projects.snap')
+
+# Change-log engine: transactions between snapshots, and events kept per project
+SNAPSHOT_EVERY = 1000
+HISTORY_LIMIT = 50
+
+
+# A compare-and-swap write found a different record version than the writer started from
+class VersionConflict(Exception):
+    def __init__(self, project_id, expected, actual):
+        super().__init__(f"Project {project_id} was changed by someone else "
+                         f"(now at version {actual}, you edited version {expected})")
+        self.project_id = project_id
+        self.expected = expected
+        self.actual = actual
+
+
+# expected_version=None skips the check; a missing record counts as version 0
+def _check_version(project_id, expected, actual):
+    if expected is not None and expected != actual:
+        raise VersionConflict(project_id, expected, actual)
+
+
+# Writes in a batch whose record is no longer at the version they expect are left out of it.
+# Returns the remaining upserts and deletes, and {project_id: VersionConflict} for the rest.
+def _split_conflicts(upserts, deletes, expected_versions, record_version):
+    conflicts = {}
+    for project_id, expected in (expected_versions or {}).items():
+        actual = record_version(project_id)
+        if expected is not None and expected != actual:
+            conflicts[project_id] = VersionConflict(project_id, expected, actual)
+    if not conflicts:
+        return upserts, deletes, conflicts
+    return ([p for p in upserts if p['id'] not in conflicts],
+            [project_id for project_id in deletes if project_id not in conflicts], conflicts)
+
+
+# In-process lock plus an flock on a side file, so several processes (the app, service.py
+# jobs) can share a file-based store. Reentrant: the file lock is taken once however deeply nested.
+class StoreLock:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                if self._file is None:
+                    self._file = open(self.path, 'ab')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            self._lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+# Base interface: full load plus single-record writes.
+# Writes return (version_before, version_after) so caches can tell whether anyone else wrote in between.
+# Every stored record also carries its own 'version': a write stores max(stored + 1, supplied version),
+# so each write bumps it and a caller that numbered several coalesced edits keeps its numbering.
+# upsert/delete with expected_version only go ahead if the record is still at that version.
+class ProjectStore:
+    def load_all(self):
+        raise NotImplementedError
+
+    def version(self):
+        raise NotImplementedError
+
+    # What version() would say for a store at path, without opening (or loading) it
+    @staticmethod
+    def version_at(path):
+        raise NotImplementedError
+
+    def upsert(self, project, expected_version=None):
+        raise NotImplementedError
+
+    def delete(self, project_id, expected_version=None):
+        raise NotImplementedError
+
+    def save_all(self, projects):
+        raise NotImplementedError
+
+    # Apply a batch of upserts and deletes as one atomic write. expected_versions maps IDs to the
+    # version their write expects; writes that find another version are left out of the batch.
+    # Returns (versions, {project_id: VersionConflict}).
+    def apply_batch(self, upserts, deletes, expected_versions=None):
+        raise NotImplementedError
+
+    # Upsert an iterable of chunks (lists of projects) in a single transaction
+    def bulk_upsert(self, chunks):
+        raise NotImplementedError
+
+    # Stream stored projects in lists of at most chunk_size
+    def iter_chunks(self, chunk_size=5000):
+        projects = self.load_all()
+        for start in range(0, len(projects), chunk_size):
+            yield projects[start:start + chunk_size]
+
+    # Change events for one project, newest first; None when the engine keeps no change log
+    def history(self, project_id):
+        return None
+
+    # Every project without its DETAIL_FIELDS (engines that can skip reading them override this)
+    def load_summaries(self):
+        return [{field: p.get(field) for field in SUMMARY_FIELDS} for p in self.load_all()]
+
+    # {id: {detail field: value}} for the given IDs; unknown IDs are left out
+    def load_details(self, project_ids):
+        wanted = set(project_ids)
+        return {p['id']: {field: p.get(field) for field in DETAIL_FIELDS}
+                for p in self.load_all() if p['id'] in wanted}
+
+
+# Legacy whole-file JSON store (every write rewrites the file, atomically via temp file + rename;
+# the read-check-rewrite runs under a StoreLock on <path>.lock)
+class JsonProjectStore(ProjectStore):
+    def __init__(self, path=JSON_PATH):
+        self.path = path
+        self._lock = StoreLock(f"{path}.lock")
+
+    @metrics.timed('store.load_all')
+    def load_all(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r') as f:
+            projects = json.load(f)
+            if metrics.enabled:
+                metrics.add('store.bytes_read', f.tell())
+        return projects
+
+    # The file's mtime and size stand in for a version counter
+    def version(self):
+        return self.version_at(self.path)
+
+    @staticmethod
+    def version_at(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _write(self, projects):
+        before = self.version()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(list(projects), f, indent=2, default=str)
+            if metrics.enabled:
+                metrics.add('store.bytes_written', f.tell())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return before, self.version()
+
+    # The row to store for project, at least one version past the stored one
+    @staticmethod
+    def _versioned(project, stored):
+        return dict(project, version=max(((stored or {}).get('version') or 0) + 1, project.get('version') or 0))
+
+    @metrics.timed('store.save_all')
+    def save_all(self, projects):
+        with self._lock:
+            stored = {p['id']: p for p in self.load_all()}
+            return self._write([self._versioned(p, stored.get(p['id'])) for p in projects])
+
+    @metrics.timed('store.upsert')
+    def upsert(self, project, expected_version=None):
+        with self._lock:
+            projects = self.load_all()
+            stored = next((p for p in projects if p['id'] == project['id']), None)
+            _check_version(project['id'], expected_version, (stored or {}).get('version') or 0)
+            projects = [p for p in projects if p['id'] != project['id']]
+            projects.append(self._versioned(project, stored))
+            return self._write(projects)
+
+    @metrics.timed('store.delete')
+    def delete(self, project_id, expected_version=None):
+        with self._lock:
+            projects = self.load_all()
+            stored = next((p for p in projects if p['id'] == project_id), None)
+            _check_version(project_id, expected_version, (stored or {}).get('version') or 0)
+            return self._write(p for p in projects if p['id'] != project_id)
+
+    @metrics.timed('store.apply_batch')
+    def apply_batch(self, upserts, deletes, expected_versions=None):
+        with self._lock:
+            projects = {p['id']: p for p in self.load_all()}
+            upserts, deletes, conflicts = _split_conflicts(
+                upserts, deletes, expected_versions,
+                lambda project_id: (projects.get(project_id) or {}).get('version') or 0)
+            for project_id in deletes:
+                projects.pop(project_id, None)
+            for project in upserts:
+                projects[project['id']] = self._versioned(project, projects.get(project['id']))
+            return self._write(projects.values()), conflicts
+
+    @metrics.timed('store.bulk_upsert')
+    def bulk_upsert(self, chunks):
+        with self._lock:
+            projects = {p['id']: p for p in self.load_all()}
+            for chunk in chunks:
+                for project in chunk:
+                    projects[project['id']] = self._versioned(project, projects.get(project['id']))
+            return self._write(projects.values())
+
+
+# Dates are stored as strings, the way json.dump(default=str) writes them
+def _plain(value):
+    return value if value is None or isinstance(value, (str, int, float)) else str(value)
+
+
+def _plain_row(project):
+    return {field: _plain(project.get(field)) for field in RECORD_FIELDS}
+
+
+# Approximate bytes moved for a batch of rows (text length of every non-null value)
+def _payload_size(rows):
+    return sum(len(str(value)) for row in rows for value in row if value is not None)
+
+
+# SQLite store: one row per project, single-row upserts and deletes (rowid keeps insertion order)
+class SQLiteProjectStore(ProjectStore):
+    def __init__(self, path=SQLITE_PATH, legacy_json_path=JSON_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+        self._migrate_json(legacy_json_path)
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    client TEXT NOT NULL,
+                    description TEXT,
+                    drive_link TEXT,
+                    status TEXT NOT NULL,
+                    deadline TEXT,
+                    value NUMERIC,
+                    priority TEXT,
+                    created_date TEXT,
+                    last_updated TEXT,
+                    version INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
+                CREATE INDEX IF NOT EXISTS idx_projects_deadline ON projects(deadline);
+                CREATE INDEX IF NOT EXISTS idx_projects_created_date ON projects(created_date);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                INSERT OR IGNORE INTO meta VALUES ('version', 0);
+            """)
+            # Databases created before per-record versions start every record at 0
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(projects)')}
+            if 'version' not in columns:
+                self._conn.execute('ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+    # Import an existing projects.json once, the first time the database is opened
+    def _migrate_json(self, json_path):
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done or not json_path or not os.path.exists(json_path):
+            return
+        projects = JsonProjectStore(json_path).load_all()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._upsert_rows(projects)
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)", (json_path,))
+                self._bump_version()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    _UPSERT_SQL = f"""
+        INSERT INTO projects ({', '.join(RECORD_FIELDS)})
+        VALUES ({', '.join('?' * len(PROJECT_FIELDS))}, max(COALESCE(?, 0), 1))
+        ON CONFLICT(id) DO UPDATE SET
+            {', '.join(f'{field} = excluded.{field}' for field in PROJECT_FIELDS[1:])},
+            version = max(projects.version + 1, excluded.version)
+    """
+
+    # Dates are stored the same way the JSON store writes them (default=str)
+    @staticmethod
+    def _row_values(project):
+        return [_plain(project.get(field)) for field in RECORD_FIELDS]
+
+    def _upsert_row(self, project):
+        values = self._row_values(project)
+        if metrics.enabled:
+            metrics.add('store.bytes_written', _payload_size([values]))
+        self._conn.execute(self._UPSERT_SQL, values)
+
+    def _upsert_rows(self, projects):
+        rows = (self._row_values(p) for p in projects)
+        if metrics.enabled:
+            rows = list(rows)
+            metrics.add('store.bytes_written', _payload_size(rows))
+        self._conn.executemany(self._UPSERT_SQL, rows)
+
+    # Every write transaction bumps a counter in the meta table
+    def _bump_version(self):
+        before = self._read_version()
+        self._conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (before + 1,))
+        return before, before + 1
+
+    def _read_version(self):
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+    def _record_version(self, project_id):
+        row = self._conn.execute('SELECT version FROM projects WHERE id = ?', (project_id,)).fetchone()
+        return row[0] if row else 0
+
+    def version(self):
+        with self._lock:
+            return self._read_version()
+
+    @staticmethod
+    def version_at(path):
+        if not os.path.exists(path):
+            return None
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            conn.close()
+        return int(row[0]) if row else None
+
+    @metrics.timed('store.load_all')
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(RECORD_FIELDS)} FROM projects ORDER BY rowid").fetchall()
+        if metrics.enabled:
+            metrics.add('store.bytes_read', _payload_size(rows))
+        return [dict(row) for row in rows]
+
+    # Only the summary columns, so description text is never read at startup
+    @metrics.timed('store.load_summaries')
+    def load_summaries(self):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_FIELDS)} FROM projects ORDER BY rowid").fetchall()
+        if metrics.enabled:
+            metrics.add('store.bytes_read', _payload_size(rows))
+        return [dict(row) for row in rows]
+
+    # Primary-key lookups in batches that stay under SQLite's bound-parameter limit
+    @metrics.timed('store.load_details')
+    def load_details(self, project_ids):
+        project_ids = list(project_ids)
+        details = {}
+        with self._lock:
+            for start in range(0, len(project_ids), 500):
+                batch = project_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, {', '.join(DETAIL_FIELDS)} FROM projects "
+                    f"WHERE id IN ({', '.join('?' * len(batch))})", batch).fetchall()
+                if metrics.enabled:
+                    metrics.add('store.bytes_read', _payload_size(rows))
+                for row in rows:
+                    details[row['id']] = {field: row[field] for field in DETAIL_FIELDS}
+        return details
+
+    # IMMEDIATE takes the write lock up front so the version check and the write see the same row
+    @metrics.timed('store.upsert')
+    def upsert(self, project, expected_version=None):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if expected_version is not None:
+                    _check_version(project['id'], expected_version, self._record_version(project['id']))
+                self._upsert_row(project)
+                versions = self._bump_version()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return versions
+
+    @metrics.timed('store.delete')
+    def delete(self, project_id, expected_version=None):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if expected_version is not None:
+                    _check_version(project_id, expected_version, self._record_version(project_id))
+                self._conn.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+                versions = self._bump_version()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return versions
+
+    @metrics.timed('store.apply_batch')
+    def apply_batch(self, upserts, deletes, expected_versions=None):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                upserts, deletes, conflicts = _split_conflicts(upserts, deletes, expected_versions,
+                                                               self._record_version)
+                self._conn.executemany('DELETE FROM projects WHERE id = ?', [(i,) for i in deletes])
+                self._upsert_rows(upserts)
+                versions = self._bump_version()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return versions, conflicts
+
+    # Chunks are inserted as they arrive; if any chunk fails the whole import rolls back
+    @metrics.timed('store.bulk_upsert')
+    def bulk_upsert(self, chunks):
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for chunk in chunks:
+                    self._upsert_rows(chunk)
+                versions = self._bump_version()
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return versions
+
+    # Reads on a separate connection (WAL allows it) so a long export never holds the write lock
+    def iter_chunks(self, chunk_size=5000):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(RECORD_FIELDS)} FROM projects ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    @metrics.timed('store.save_all')
+    def save_all(self, projects):
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                keep = {p['id'] for p in projects}
+                stale = [(row[0],) for row in self._conn.execute('SELECT id FROM projects')
+                         if row[0] not in keep]
+                self._conn.executemany('DELETE FROM projects WHERE id = ?', stale)
+                self._upsert_rows(projects)
+                versions = self._bump_version()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return versions
+
+
+# The typed change event that turns stored row old into new (None means absent), or None if nothing changed
+def change_event(old, new):
+    if new is None:
+        return None if old is None else {'type': 'delete', 'id': old['id']}
+    if old is None:
+        return {'type': 'create', 'id': new['id'], 'record': new}
+    changes = {field: new[field] for field in PROJECT_FIELDS[1:] if new[field] != old.get(field)}
+    if not changes:
+        return None
+    if 'status' in changes:
+        return {'type': 'status', 'id': new['id'], 'from': old.get('status'), 'changes': changes}
+    return {'type': 'update', 'id': new['id'], 'changes': changes}
+
+
+# Append-only change log: each write transaction is one JSON line of typed events
+# (create, update, status, delete), so a write costs one append however large the
+# portfolio is. Every SNAPSHOT_EVERY transactions the current state and the recent
+# per-project history are compacted into a snapshot and the log starts over, so
+# opening the store reads the snapshot and replays only the tail. A torn last line
+# (crash mid-append) is ignored on replay and cut off by the next append.
+# Several processes (the app, service.py jobs) may share one log: catch-up, append and
+# compaction all run under a StoreLock on <path>.lock.
+class LogProjectStore(ProjectStore):
+    def __init__(self, path=LOG_PATH, snapshot_every=SNAPSHOT_EVERY, history_limit=HISTORY_LIMIT):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.snapshot_every = snapshot_every
+        self.history_limit = history_limit
+        self._lock = StoreLock(f"{path}.lock")
+        with self._lock:
+            self._reload()
+
+    def _reload(self):
+        self._projects = {}
+        self._history = {}
+        self._seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+                if metrics.enabled:
+                    metrics.add('store.bytes_read', f.tell())
+            self._seq = snapshot['seq']
+            self._projects = {p['id']: p for p in snapshot['projects']}
+            self._history = {project_id: deque(events, maxlen=self.history_limit)
+                             for project_id, events in snapshot['history'].items()}
+        self._snapshot_seq = self._seq
+        self._inode = None
+        self._offset = 0
+        self._catch_up()
+
+    # Replay whatever was appended since we last looked (possibly by another process).
+    # A new inode means someone compacted the log, so start again from their snapshot.
+    def _catch_up(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if self._inode is not None and (stat is None or stat.st_ino != self._inode or stat.st_size < self._offset):
+            return self._reload()
+        if stat is None:
+            return
+        self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        if metrics.enabled:
+            metrics.add('store.bytes_read', len(data))
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._replay(json.loads(line))
+        self._offset += end
+
+    def _replay(self, transaction):
+        if transaction['seq'] <= self._seq:
+            return
+        self._seq = transaction['seq']
+        for event in transaction['events']:
+            project_id = event['id']
+            if event['type'] == 'create':
+                self._projects[project_id] = dict(event['record'], version=event.get('version', 1))
+            elif event['type'] == 'delete':
+                self._projects.pop(project_id, None)
+            elif project_id in self._projects:
+                stored = self._projects[project_id]
+                self._projects[project_id] = dict(stored, **event['changes'],
+                                                  version=event.get('version', stored.get('version', 0) + 1))
+            # History entries leave out the full record so they stay small
+            entry = {key: value for key, value in event.items() if key not in ('id', 'record')}
+            entry['seq'] = transaction['seq']
+            entry['at'] = transaction['at']
+            history = self._history.get(project_id)
+            if history is None:
+                history = self._history[project_id] = deque(maxlen=self.history_limit)
+            history.append(entry)
+
+    # The log file's inode and size stand in for a version counter
+    def version(self):
+        return self.version_at(self.path)
+
+    @staticmethod
+    def version_at(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    # Append one transaction; new_rows maps id -> plain row, or None for a delete
+    def _commit(self, new_rows):
+        before = self.version()
+        events = []
+        for project_id, row in new_rows.items():
+            event = change_event(self._projects.get(project_id), row)
+            if event is None and row is not None:
+                # Rewriting an unchanged record still bumps its version
+                event = {'type': 'update', 'id': project_id, 'changes': {}}
+            if event is not None:
+                if row is not None:
+                    event['version'] = max(self._record_version(project_id) + 1, row.get('version') or 0)
+                events.append(event)
+        if not events:
+            return before, before
+        transaction = {'seq': self._seq + 1, 'at': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'events': events}
+        line = (json.dumps(transaction, default=str) + '\n').encode('utf-8')
+        with open(self.path, 'a+b') as f:
+            if f.seek(0, os.SEEK_END) != self._offset:
+                # Catch-up replayed every complete line, so what is left can only be a torn one
+                f.seek(self._offset)
+                if b'\n' in f.read():
+                    raise RuntimeError(f"{self.path} was appended to by another writer without its lock")
+                f.truncate(self._offset)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            self._inode = os.fstat(f.fileno()).st_ino
+        if metrics.enabled:
+            metrics.add('store.bytes_written', len(line))
+        self._replay(transaction)
+        self._offset += len(line)
+        if self._seq - self._snapshot_seq >= self.snapshot_every:
+            self.compact()
+        return before, self.version()
+
+    # Write a snapshot of the current state and start an empty log. The snapshot records
+    # the last sequence number it covers, so a crash between the two steps only means
+    # some already-applied transactions are skipped on replay.
+    def compact(self):
+        with self._lock:
+            self._catch_up()
+            history = {project_id: list(events) for project_id, events in self._history.items()
+                       if project_id in self._projects}
+            snapshot = {'seq': self._seq, 'projects': list(self._projects.values()), 'history': history}
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'), default=str)
+                if metrics.enabled:
+                    metrics.add('store.bytes_written', f.tell())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._history = {project_id: deque(events, maxlen=self.history_limit)
+                             for project_id, events in history.items()}
+            self._snapshot_seq = self._seq
+            self._inode = os.stat(self.path).st_ino
+            self._offset = 0
+
+    @metrics.timed('store.load_all')
+    def load_all(self):
+        with self._lock:
+            self._catch_up()
+            return [dict(project) for project in self._projects.values()]
+
+    def load_summaries(self):
+        with self._lock:
+            self._catch_up()
+            return [{field: p.get(field) for field in SUMMARY_FIELDS} for p in self._projects.values()]
+
+    def load_details(self, project_ids):
+        with self._lock:
+            self._catch_up()
+            return {project_id: {field: self._projects[project_id].get(field) for field in DETAIL_FIELDS}
+                    for project_id in project_ids if project_id in self._projects}
+
+    def history(self, project_id):
+        with self._lock:
+            self._catch_up()
+            return list(reversed(self._history.get(project_id, ())))
+
+    def _record_version(self, project_id):
+        return self._projects.get(project_id, {}).get('version', 0)
+
+    @metrics.timed('store.upsert')
+    def upsert(self, project, expected_version=None):
+        with self._lock:
+            self._catch_up()
+            _check_version(project['id'], expected_version, self._record_version(project['id']))
+            return self._commit({project['id']: _plain_row(project)})
+
+    @metrics.timed('store.delete')
+    def delete(self, project_id, expected_version=None):
+        with self._lock:
+            self._catch_up()
+            _check_version(project_id, expected_version, self._record_version(project_id))
+            return self._commit({project_id: None})
+
+    @metrics.timed('store.apply_batch')
+    def apply_batch(self, upserts, deletes, expected_versions=None):
+        with self._lock:
+            self._catch_up()
+            upserts, deletes, conflicts = _split_conflicts(upserts, deletes, expected_versions,
+                                                           self._record_version)
+            new_rows = {project_id: None for project_id in deletes}
+            for project in upserts:
+                new_rows[project['id']] = _plain_row(project)
+            return self._commit(new_rows), conflicts
+
+    # Every chunk goes into a single transaction line, so a failed import leaves no trace
+    @metrics.timed('store.bulk_upsert')
+    def bulk_upsert(self, chunks):
+        with self._lock:
+            self._catch_up()
+            new_rows = {}
+            for chunk in chunks:
+                for project in chunk:
+                    new_rows[project['id']] = _plain_row(project)
+            return self._commit(new_rows)
+
+    @metrics.timed('store.save_all')
+    def save_all(self, projects):
+        with self._lock:
+            self._catch_up()
+            new_rows = {project['id']: _plain_row(project) for project in projects}
+            for project_id in self._projects:
+                new_rows.setdefault(project_id, None)
+            return self._commit(new_rows)
+
+
+# Binary snapshot layout: b'BTS1', a little-endian u32 header length, a JSON header
+# {'rows': n, 'columns': {field: {'type': ..., 'sections': [[offset, length], ...]}}}
+# and then the sections, each 8-byte aligned, offsets counted from the end of the header.
+#   text      u64 byte offsets (n + 1), then the UTF-8 of every value back to back;
+#             a None value is empty and has the top bit set on its end offset
+#   dict      u32 codes (0xFFFFFFFF for None), then a text column of the distinct values
+#   date      i32 proleptic ordinals, 0 for None
+#   datetime  i64 microseconds since datetime.min (naive; aware values are stored as UTC), -1 for None,
+#             then, only if some value is aware, i32 UTC offsets in seconds (-2**31 for naive values)
+#   number    f64, read back as int when whole (like parse_value)
+#   int       i64
+SNAPSHOT_MAGIC = b'BTS1'
+SNAPSHOT_COLUMNS = {
+    'id': 'text',
+    'title': 'text',
+    'client': 'dict',
+    'description': 'text',
+    'drive_link': 'text',
+    'status': 'dict',
+    'deadline': 'date',
+    'value': 'number',
+    'priority': 'dict',
+    'created_date': 'date',
+    'last_updated': 'datetime',
+    'version': 'int',
+}
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_NULL_OFFSET = 1 << 63
+_NULL_CODE = 0xFFFFFFFF
+_NAIVE = -2 ** 31
+
+
+def _pack_numbers(code, values):
+    packed = array.array(code, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+# Numbers straight out of a (memory-mapped) section; no copy on little-endian machines
+def _unpack_numbers(code, view):
+    if sys.byteorder == 'little':
+        return view.cast(code).tolist()
+    packed = array.array(code, bytes(view))
+    packed.byteswap()
+    return packed.tolist()
+
+
+def _encode_text(values):
+    encoded = [None if value is None else str(value).encode('utf-8') for value in values]
+    if None not in encoded:
+        return [_pack_numbers('Q', [0, *accumulate(map(len, encoded))]), b''.join(encoded)]
+    offsets = [0]
+    end = 0
+    for value in encoded:
+        if value is None:
+            offsets.append(end | _NULL_OFFSET)
+        else:
+            end += len(value)
+            offsets.append(end)
+    return [_pack_numbers('Q', offsets), b''.join(value for value in encoded if value)]
+
+
+def _encode_datetime(value):
+    if value is None:
+        return -1
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - datetime.datetime.min) // _MICROSECOND
+
+
+def _utc_offset(value):
+    if value is None or value.tzinfo is None:
+        return _NAIVE
+    return int(value.utcoffset().total_seconds())
+
+
+def _encode_column(kind, values):
+    if kind == 'text':
+        return _encode_text(values)
+    if kind == 'dict':
+        table = {}
+        codes = [_NULL_CODE if value is None else table.setdefault(str(value), len(table)) for value in values]
+        return [_pack_numbers('I', codes), *_encode_text(table)]
+    if kind == 'date':
+        return [_pack_numbers('i', [date.toordinal() if date else 0 for date in map(parse_date, values)])]
+    if kind == 'datetime':
+        values = [parse_datetime(value) for value in values]
+        sections = [_pack_numbers('q', [_encode_datetime(value) for value in values])]
+        offsets = [_utc_offset(value) for value in values]
+        if any(offset != _NAIVE for offset in offsets):
+            sections.append(_pack_numbers('i', offsets))
+        return sections
+    if kind == 'number':
+        return [_pack_numbers('d', [float(parse_value(value)) for value in values])]
+    return [_pack_numbers('q', [int(value or 0) for value in values])]
+
+
+# Write projects as a snapshot (temp file + rename, so open readers keep their old mapping)
+def write_snapshot(path, projects):
+    projects = list(projects)
+    columns = {}
+    sections = []
+    offset = 0
+    for field, kind in SNAPSHOT_COLUMNS.items():
+        column = _encode_column(kind, [project.get(field) for project in projects])
+        columns[field] = {'type': kind, 'sections': []}
+        for section in column:
+            columns[field]['sections'].append([offset, len(section)])
+            sections.append(section)
+            offset += len(section) + -len(section) % 8
+    header = json.dumps({'rows': len(projects), 'columns': columns}).encode('utf-8')
+    header += b' ' * (-(len(header) + 8) % 8)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack('<I', len(header)) + header)
+        for section in sections:
+            f.write(section + b'\0' * (-len(section) % 8))
+        written = f.tell()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return written
+
+
+# Read-only view of a snapshot file. Sections are sliced out of a shared memory map and
+# decoded on request, so columns (or rows) nobody asks for are never parsed, and every
+# process reading the same file shares the page cache instead of holding its own copy.
+class Snapshot:
+    def __init__(self, path):
+        self.rows = 0
+        self._columns = {}
+        self._tables = {}
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        if bytes(view[:4]) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a bid tracker snapshot")
+        header_length, = struct.unpack_from('<I', view, 4)
+        header = json.loads(bytes(view[8:8 + header_length]))
+        base = 8 + header_length
+        self.rows = header['rows']
+        self._columns = {
+            field: (column['type'],
+                    [view[base + offset:base + offset + length] for offset, length in column['sections']])
+            for field, column in header['columns'].items()
+        }
+
+    # Bytes of the sections behind these fields (for the bytes-read counter)
+    def size(self, fields):
+        return sum(len(section) for field in fields for section in self._columns.get(field, (None, []))[1])
+
+    # Values of one field for rows start..stop (fields missing from older files read as None)
+    def column(self, field, start=0, stop=None):
+        stop = self.rows if stop is None else min(stop, self.rows)
+        if field not in self._columns:
+            return [None] * max(stop - start, 0)
+        kind, sections = self._columns[field]
+        if kind == 'text':
+            return self._text(sections, start, stop)
+        if kind == 'dict':
+            table = self._tables.get(field)
+            if table is None:
+                table = self._tables[field] = [sys.intern(value) for value in
+                                               self._text(sections[1:], 0, len(sections[1]) // 8 - 1)]
+            codes = _unpack_numbers('I', sections[0][start * 4:stop * 4])
+            if _NULL_CODE not in codes:
+                return [table[code] for code in codes]
+            return [None if code == _NULL_CODE else table[code] for code in codes]
+        if kind == 'date':
+            ordinals = _unpack_numbers('i', sections[0][start * 4:stop * 4])
+            # One object per distinct day, shared by every row that has it
+            dates = {ordinal: datetime.date.fromordinal(ordinal) for ordinal in set(ordinals) if ordinal}
+            return [dates.get(ordinal) for ordinal in ordinals]
+        values = _unpack_numbers('d' if kind == 'number' else 'q', sections[0][start * 8:stop * 8])
+        if kind == 'number':
+            return [int(value) if value.is_integer() else value for value in values]
+        if kind == 'datetime':
+            stamps = {value: datetime.datetime.min + datetime.timedelta(microseconds=value)
+                      for value in set(values) if value >= 0}
+            if len(sections) == 1:
+                return [stamps.get(value) for value in values]
+            # Aware values come back in their original UTC offset
+            offsets = _unpack_numbers('i', sections[1][start * 4:stop * 4])
+            zones = {offset: datetime.timezone(datetime.timedelta(seconds=offset))
+                     for offset in set(offsets) if offset != _NAIVE}
+            return [stamps.get(value) if offset == _NAIVE else
+                    stamps[value].replace(tzinfo=datetime.timezone.utc).astimezone(zones[offset])
+                    for value, offset in zip(values, offsets)]
+        return values
+
+    @staticmethod
+    def _text(sections, start, stop):
+        offsets = _unpack_numbers('Q', sections[0][start * 8:(stop + 1) * 8])
+        if not offsets:
+            return []
+        # None values are flagged by the top bit of their end offset
+        nulls = None
+        if max(offsets) >= _NULL_OFFSET:
+            nulls = [offset >= _NULL_OFFSET for offset in offsets[1:]]
+            offsets = [offset & (_NULL_OFFSET - 1) for offset in offsets]
+        # One copy of just this stretch of text, then a slice per value; ASCII text
+        # (byte offsets == character offsets) is decoded once and sliced as str
+        first = offsets[0]
+        data = bytes(sections[1][first:offsets[-1]])
+        if data.isascii():
+            text = data.decode('ascii')
+            values = [text[begin - first:end - first] for begin, end in zip(offsets, offsets[1:])]
+        else:
+            values = [data[begin - first:end - first].decode('utf-8') for begin, end in zip(offsets, offsets[1:])]
+        if nulls is None:
+            return values
+        return [None if null else value for value, null in zip(values, nulls)]
+
+    # Rows start..stop as dicts of the given fields
+    def records(self, fields, start=0, stop=None):
+        columns = [self.column(field, start, stop) for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+
+# Whole-file store like JsonProjectStore (and sharing its write logic), but in the binary
+# columnar snapshot format: dates, numbers and versions keep their types, summaries are
+# read without touching the description text, and details come straight from the mapping.
+class BinaryProjectStore(JsonProjectStore):
+    def __init__(self, path=SNAPSHOT_PATH, legacy_json_path=JSON_PATH):
+        super().__init__(path)
+        self._snapshot = None
+        self._snapshot_version = None
+        self._rows_by_id = None
+        if legacy_json_path and not os.path.exists(path) and os.path.exists(legacy_json_path):
+            self._write([self._versioned(p, None) for p in JsonProjectStore(legacy_json_path).load_all()])
+
+    # A rewrite always lands as a new file, so the inode changes along with mtime and size
+    def version(self):
+        return self.version_at(self.path)
+
+    @staticmethod
+    def version_at(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    # The current file's Snapshot, re-mapped only when the file has been replaced
+    def _open(self):
+        with self._lock:
+            version = self.version()
+            if self._snapshot is None or version != self._snapshot_version:
+                self._snapshot = Snapshot(self.path) if version is not None else None
+                self._snapshot_version = version
+                self._rows_by_id = None
+            return self._snapshot
+
+    def _read(self, fields, start=0, stop=None):
+        snapshot = self._open()
+        if snapshot is None:
+            return []
+        if metrics.enabled:
+            metrics.add('store.bytes_read', snapshot.size(fields))
+        return snapshot.records(fields, start, stop)
+
+    @metrics.timed('store.load_all')
+    def load_all(self):
+        return self._read(RECORD_FIELDS)
+
+    @metrics.timed('store.load_summaries')
+    def load_summaries(self):
+        return self._read(SUMMARY_FIELDS)
+
+    def iter_chunks(self, chunk_size=5000):
+        snapshot = self._open()
+        for start in range(0, snapshot.rows if snapshot is not None else 0, chunk_size):
+            yield self._read(RECORD_FIELDS, start, start + chunk_size)
+
+    @metrics.timed('store.load_details')
+    def load_details(self, project_ids):
+        with self._lock:
+            snapshot = self._open()
+            if snapshot is None:
+                return {}
+            if self._rows_by_id is None:
+                self._rows_by_id = {project_id: row for row, project_id in enumerate(snapshot.column('id'))}
+            rows_by_id = self._rows_by_id
+        found = {}
+        for project_id in project_ids:
+            row = rows_by_id.get(project_id)
+            if row is not None:
+                found[project_id] = snapshot.records(DETAIL_FIELDS, row, row + 1)[0]
+        return found
+
+    def _write(self, projects):
+        before = self.version()
+        written = write_snapshot(self.path, projects)
+        if metrics.enabled:
+            metrics.add('store.bytes_written', written)
+        return before, self.version()
+
+
+STORES = {
+    'json': JsonProjectStore,
+    'sqlite': SQLiteProjectStore,
+    'log': LogProjectStore,
+    'binary': BinaryProjectStore,
+}
+
+
+STORE_EXTENSIONS = {
+    '.json': 'json',
+    '.db': 'sqlite',
+    '.sqlite': 'sqlite',
+    '.log': 'log',
+    '.snap': 'binary',
+}
+
+
+# Pick the storage engine from BID_TRACKER_STORAGE (defaults to SQLite)
+def open_store(kind=None):
+    kind = kind or os.environ.get('BID_TRACKER_STORAGE', 'sqlite')
+    if kind not in STORES:
+        raise ValueError(f"Unknown storage engine '{kind}'. Choose one of: {', '.join(STORES)}")
+    return STORES[kind]()
+
+
+def store_kind(path):
+    kind = STORE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if kind is None:
+        raise ValueError(f"Cannot tell the storage engine of '{path}'. "
+                         f"Use one of the extensions {', '.join(STORE_EXTENSIONS)}")
+    return kind
+
+
+# Open the store at path, with the engine taken from its extension (east.db, west.json, ...).
+# Stores opened this way never pull in the default projects.json.
+def open_store_at(path):
+    kind = store_kind(path)
+    if kind in ('sqlite', 'binary'):
+        return STORES[kind](path, legacy_json_path=None)
+    return STORES[kind](path)
+
+
+# Version of the store at path without opening it (cheap enough to poll)
+def store_version_at(path):
+    return STORES[store_kind(path)].version_at(path)
+
+
+# Handle for one queued write; resolved once the batch containing it has been flushed
+class FlushTicket:
+    def __init__(self):
+        self._event = threading.Event()
+        self.error = None
+        self.versions = None
+
+    def _resolve(self, versions=None, error=None):
+        self.versions = versions
+        self.error = error
+        self._event.set()
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    # Block until flushed; re-raises the write error, returns False on timeout
+    def wait(self, timeout=None):
+        if not self._event.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+# Background writer that takes mutations off the request path. Writes from every session
+# are coalesced per project ID for a short window and flushed as one atomic batch
+# (a transaction for SQLite, temp file + rename for JSON). A failed batch is kept and
+# retried with backoff; the error is exposed as last_error and on each ticket.
+# A write with an expected_version is checked inside the batch; if the stored record has
+# moved on, only that write is dropped and its tickets get the VersionConflict.
+class WriteBehindWriter:
+    def __init__(self, store, delay=0.05, on_flush=None):
+        self.store = store
+        self.delay = delay
+        self.on_flush = on_flush
+        self.last_error = None
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._tickets = []
+        self._inflight = False
+        self._urgent = False
+        self._closing = False
+        self._failures = 0
+        self._thread = threading.Thread(target=self._run, name='project-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # True while writes are queued or being flushed
+    @property
+    def busy(self):
+        return bool(self._pending) or self._inflight
+
+    def _submit(self, project_id, op, project, expected_version):
+        ticket = FlushTicket()
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Writer is closed")
+            # Re-insert so the newest change for an ID is the one that gets written; a change
+            # that builds on a queued one keeps the stored version that one started from
+            queued = self._pending.pop(project_id, None)
+            if queued is not None and queued[2] is not None:
+                expected_version = queued[2]
+            self._pending[project_id] = (op, project, expected_version)
+            self._tickets.append((project_id, ticket))
+            self._cond.notify_all()
+        return ticket
+
+    def submit_upsert(self, project, expected_version=None):
+        return self._submit(project['id'], 'upsert', project, expected_version)
+
+    def submit_delete(self, project_id, expected_version=None):
+        return self._submit(project_id, 'delete', None, expected_version)
+
+    # Wait until everything queued so far is on disk; re-raises the last write error
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._urgent = True
+            self._cond.notify_all()
+            while self.busy and self.last_error is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            if self.last_error is not None:
+                raise self.last_error
+        return True
+
+    def close(self):
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._urgent = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Give a burst of edits a moment to coalesce into one write
+                deadline = time.monotonic() + self.delay
+                while not self._urgent and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                batch, tickets = self._pending, self._tickets
+                self._pending, self._tickets, self._urgent = {}, [], False
+                self._inflight = True
+
+            upserts = [project for op, project, _ in batch.values() if op == 'upsert']
+            deletes = [project_id for project_id, (op, _, _) in batch.items() if op == 'delete']
+            expected = {project_id: version for project_id, (_, _, version) in batch.items() if version is not None}
+            versions, conflicts, error = None, {}, None
+            try:
+                versions, conflicts = self.store.apply_batch(upserts, deletes, expected)
+                if self.on_flush is not None:
+                    self.on_flush(versions, conflicts)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._inflight = False
+                if error is None:
+                    self.last_error = None
+                    self._failures = 0
+                else:
+                    self.last_error = error
+                    self._failures += 1
+                    # Keep the failed changes unless something newer was queued for the same ID
+                    # (which then checks against the version the failed one expected)
+                    for project_id, op in batch.items():
+                        newer = self._pending.get(project_id)
+                        if newer is None:
+                            self._pending[project_id] = op
+                        elif op[2] is not None:
+                            self._pending[project_id] = (newer[0], newer[1], op[2])
+                self._cond.notify_all()
+            for project_id, ticket in tickets:
+                ticket._resolve(versions, error or conflicts.get(project_id))
+            if error is not None:
+                if self._closing:
+                    return
+                time.sleep(min(0.5 * 2 ** self._failures, 30))
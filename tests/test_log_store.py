@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+
+from storage import LogProjectStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _project(project_id, **fields):
+    return dict({'id': project_id, 'title': project_id, 'client': 'Acme', 'status': 'Draft',
+                 'priority': 'Medium', 'value': 1, 'description': '', 'drive_link': ''}, **fields)
+
+
+def _titles(store):
+    return {p['id']: p['title'] for p in store.load_all()}
+
+
+# Run store operations in a separate Python process against the same log
+def _in_other_process(path, code):
+    script = f"from storage import LogProjectStore\nstore = LogProjectStore({path!r})\n{code}"
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+
+
+def test_replay_ignores_torn_last_line(tmp_path):
+    path = str(tmp_path / 'projects.log')
+    store = LogProjectStore(path)
+    store.upsert(_project('A'))
+    store.upsert(_project('B'))
+    with open(path, 'ab') as f:
+        f.write(b'{"seq": 3, "at": "2026-01-01T00:00:00", "ev')
+
+    reopened = LogProjectStore(path)
+    assert _titles(reopened) == {'A': 'A', 'B': 'B'}
+
+    # The next append cuts the torn tail off, so every line parses again
+    reopened.upsert(_project('C'))
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)['seq'] for line in lines] == [1, 2, 3]
+    assert _titles(LogProjectStore(path)) == {'A': 'A', 'B': 'B', 'C': 'C'}
+
+
+def test_append_then_compact_across_processes(tmp_path):
+    path = str(tmp_path / 'projects.log')
+    store = LogProjectStore(path)
+    store.upsert(_project('A'))
+
+    _in_other_process(path, "store.upsert(dict(store.load_all()[0], id='B', title='B'))\nstore.compact()")
+    assert os.path.getsize(path) == 0
+    assert _titles(store) == {'A': 'A', 'B': 'B'}
+
+    # Appending on top of the other process's compaction keeps its snapshot and our state
+    store.upsert(_project('A', title='A2'), expected_version=1)
+    _in_other_process(path, "store.upsert(dict(next(p for p in store.load_all() if p['id'] == 'B'), title='B2'))")
+    assert _titles(store) == {'A': 'A2', 'B': 'B2'}
+    assert {p['id']: p['version'] for p in LogProjectStore(path).load_all()} == {'A': 2, 'B': 2}
+
+
+def test_reload_from_snapshot_plus_tail(tmp_path):
+    path = str(tmp_path / 'projects.log')
+    store = LogProjectStore(path, snapshot_every=3)
+    for project_id in ('A', 'B', 'C'):
+        store.upsert(_project(project_id))
+    assert os.path.exists(f"{path}.snapshot")
+    assert os.path.getsize(path) == 0
+    store.upsert(_project('A', status='Submitted'))
+    store.upsert(_project('D'))
+
+    reopened = LogProjectStore(path, snapshot_every=3)
+    assert reopened.load_all() == store.load_all()
+    assert {p['id']: (p['status'], p['version']) for p in reopened.load_all()} == \
+        {'A': ('Submitted', 2), 'B': ('Draft', 1), 'C': ('Draft', 1), 'D': ('Draft', 1)}
+    # History spans the snapshot and the tail
+    assert [event['type'] for event in reopened.history('A')] == ['status', 'create']
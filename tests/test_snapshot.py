@@ -0,0 +1,84 @@
+import datetime
+
+from models import RECORD_FIELDS
+from storage import BinaryProjectStore, Snapshot, write_snapshot
+
+
+def _row(**fields):
+    row = dict.fromkeys(RECORD_FIELDS)
+    row.update(fields)
+    return row
+
+
+def _round_trip(tmp_path, rows):
+    path = tmp_path / 'projects.snap'
+    write_snapshot(path, rows)
+    return Snapshot(path).records(RECORD_FIELDS)
+
+
+def test_none_text_and_dict_values_stay_none(tmp_path):
+    rows = [
+        _row(id='A', title='Alpha', client=None, priority=None, description=None, drive_link=''),
+        _row(id='B', title=None, client='', priority='High', description='', drive_link=None),
+        _row(id='C', title='Gamma', client='Acme', priority=None, description='x', drive_link='y'),
+    ]
+    records = _round_trip(tmp_path, rows)
+    for field in ('title', 'client', 'priority', 'description', 'drive_link'):
+        assert [record[field] for record in records] == [row[field] for row in rows], field
+
+
+def test_partial_reads_keep_nulls_in_place(tmp_path):
+    rows = [_row(id=str(i), title=None if i % 3 else f"t{i}") for i in range(10)]
+    path = tmp_path / 'projects.snap'
+    write_snapshot(path, rows)
+    assert Snapshot(path).column('title', 4, 8) == [None, None, 't6', None]
+
+
+def test_non_ascii_text(tmp_path):
+    rows = [
+        _row(id='A', title='Café Ölwerk', client='Müller & Söhne', description='naïve – 日本語 ✓'),
+        _row(id='B', title='plain', client='Müller & Söhne', description=None),
+    ]
+    records = _round_trip(tmp_path, rows)
+    assert [(r['title'], r['client'], r['description']) for r in records] == \
+        [('Café Ölwerk', 'Müller & Söhne', 'naïve – 日本語 ✓'), ('plain', 'Müller & Söhne', None)]
+
+
+def test_float_values(tmp_path):
+    rows = [_row(id=str(i), value=value) for i, value in enumerate([0.1, 1234567.89, 5, 2.5e-7, -3.75])]
+    records = _round_trip(tmp_path, rows)
+    assert [record['value'] for record in records] == [0.1, 1234567.89, 5, 2.5e-7, -3.75]
+    assert isinstance(records[2]['value'], int)
+
+
+def test_datetimes_keep_their_utc_offset(tmp_path):
+    plus_two = datetime.timezone(datetime.timedelta(hours=2))
+    stamps = [
+        datetime.datetime(2026, 3, 1, 9, 30, tzinfo=plus_two),
+        datetime.datetime(2026, 3, 1, 9, 30),
+        None,
+        datetime.datetime(2026, 3, 1, 9, 30, 0, 5, tzinfo=datetime.timezone.utc),
+    ]
+    records = _round_trip(tmp_path, [_row(id=str(i), last_updated=stamp) for i, stamp in enumerate(stamps)])
+    loaded = [record['last_updated'] for record in records]
+    assert loaded == stamps
+    assert [stamp.utcoffset() if stamp else None for stamp in loaded] == \
+        [datetime.timedelta(hours=2), None, None, datetime.timedelta(0)]
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / 'projects.snap'
+    write_snapshot(path, [])
+    snapshot = Snapshot(path)
+    assert snapshot.rows == 0
+    assert snapshot.records(RECORD_FIELDS) == []
+    assert snapshot.column('client') == []
+
+
+def test_store_round_trip(tmp_path):
+    store = BinaryProjectStore(str(tmp_path / 'projects.snap'), legacy_json_path=None)
+    assert store.load_all() == []
+    store.upsert(_row(id='A', title='Ünïcode', client=None, status='Draft', priority=None, value=12.5))
+    [record] = store.load_all()
+    assert (record['title'], record['client'], record['priority'], record['value']) == ('Ünïcode', None, None, 12.5)
+    assert store.load_details(['A']) == {'A': {'description': None, 'drive_link': None}}